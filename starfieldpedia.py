@@ -1,14 +1,17 @@
 import os
 import json
-import pandas as pd
-from tkinter import Tk, messagebox, ttk
-
-def lowercase_keys(input_dict):
-    """Recursively convert all keys in dictionary to lowercase."""
-    if not isinstance(input_dict, dict):
-        return input_dict
-
-    return {k.lower(): lowercase_keys(v) for k, v in input_dict.items()}
+import queue
+import threading
+from tkinter import Tk, Toplevel, StringVar, messagebox, ttk
+from starfieldpedia_catalog import (FAUNA, SYSTEMS_DIRECTORY, Catalog, CatalogBuilder, load_catalog_batches,
+                                    parse_sources)
+from starfieldpedia_index import OrganismIndex, PlanetIndex, ResourceIndex
+from starfieldpedia_outpost import OutpostOptimizer, resource_weight
+from starfieldpedia_query import OrganismQueryEngine, QueryEngine, QuerySyntaxError
+from starfieldpedia_recipes import RecipeBook, RecipeError
+from starfieldpedia_store import PLANET_COLUMNS, PlanetStore
+from starfieldpedia_tree import TreeBatch, VirtualTreeview
+from starfieldpedia_watch import DirectoryWatcher
 
 # def load__resources():
 #     """Load organic and inorganic resources."""
@@ -34,199 +37,565 @@ def load_organic_resources():
 inorg_resources_dict = load_inorganic_resources()
 org_resources_dict = load_organic_resources()
 
-def on_planet_selected(event):
-    """Handle planet selection in the Treeview."""
-    item = tree.selection()[0]  # get selected item
-    planet_name = tree.item(item)["values"][0]
-
-    item_values = tree.item(item)["values"]
-    selected_name = item_values[0]
-    
-    # Check if selected name is a planet
-    if selected_name in df['name'].values:
-        planet_name = selected_name
-    else:
-        # If it's not a planet, then it might be a resource or a header.
-        # Check if the parent of the selected item is a planet.
+# Header of the resource rows shown under an expanded planet
+RESOURCE_HEADER = ("Resource Name", "Element", "Rarity", "State", "Weight", "Value")
+# Header of the organism rows shown under an expanded organic resource
+ORGANISM_HEADER = ("Name", "Temperament", "Biomes", "Outpost")
+# Columns of the organism list windows ("where can I farm", organism search)
+ORGANISM_COLUMNS = ("Organism", "Kind", "Planet", "System", "Biomes", "Outpost")
+# Columns of the outpost plan window
+OUTPOST_COLUMNS = ("Plan", "Planet", "System", "Covers", "Score")
+# Columns of the recipe demand window
+DEMAND_COLUMNS = ("Resource", "Quantity", "Planet", "System")
+
+
+def resource_details(resource):
+    """Return the catalog entry of a resource, inorganic first; {} for unknown names."""
+    if resource in inorg_resources_dict:
+        return inorg_resources_dict[resource]
+    return org_resources_dict.get(resource, {})
+
+
+def organism_values(source):
+    """Return the Treeview values of an organism row under an expanded organic resource."""
+    return (source.name, source.temperament, ', '.join(source.biomes), "UNK" if source.outpost is None else source.outpost)
+
+
+# How often the Tk main loop checks the loader queue, and how many batches it takes per check
+POLL_MS = 50
+BATCHES_PER_POLL = 4
+
+# How often the Systems folder is checked for edited, added or deleted files once loaded
+WATCH_MS = 1000
+
+
+class PlanetViewer:
+    """Planet list window; planets are loaded on a background thread and shown as they arrive."""
+
+    def __init__(self, root):
+        self.root = root
+        root.title("Planet Details")
+        root.geometry("800x400")
+
+        # Planet data; filled in batch by batch by poll_loader
+        self.catalog = None
+        self.store = PlanetStore(list(inorg_resources_dict) + list(org_resources_dict))
+        self.resource_index = ResourceIndex(self.store.resource_names, self.store)  # reads the store's masks
+        self.planet_index = PlanetIndex()
+        self.organism_index = OrganismIndex(self.resource_index.resource_names)
+        self.query_engine = QueryEngine(self.resource_index, self.planet_index)
+        self.organism_query = OrganismQueryEngine(self.organism_index)
+        self.outpost_optimizer = OutpostOptimizer(self.resource_index, self.organism_index, {
+            name: resource_weight(resource_details(name)) for name in self.resource_index.resource_names})
+        self.row_filter = None  # picks the rows that join the current view as they load or reload
+        self.load_errors = []  # (path, message) for system files that could not be parsed
+
+        # Live reload: the row ids each system file currently owns
+        self.watcher = None
+        self.source_rows = {}
+        self.next_row = 0
+
+        # Query bar, e.g. "Helium-3 AND Water AND NOT Inferno" or "Iron AND gravity:0.5..1.2"
+        query_frame = ttk.Frame(root)
+        query_frame.pack(fill="x", padx=20, pady=(10, 0))
+        self.query_var = StringVar()
+        query_entry = ttk.Entry(query_frame, textvariable=self.query_var)
+        query_entry.pack(side="left", fill="x", expand=True)
+        query_entry.bind("<Return>", self.run_query)
+        ttk.Button(query_frame, text="Search", command=self.run_query).pack(side="left", padx=5)
+
+        # Every organism yielding an organic resource, across all systems
+        self.farm_var = StringVar()
+        ttk.Combobox(query_frame, textvariable=self.farm_var, values=list(org_resources_dict),
+                     state="readonly", width=16).pack(side="left", padx=(15, 0))
+        ttk.Button(query_frame, text="Where to farm",
+                   command=lambda: self.show_farm_sources(self.farm_var.get())).pack(side="left", padx=5)
+
+        # Organism search by biome, temperament and yield, e.g. "Deciduous Forest AND Mountains AND Peaceful AND yields:Sealant"
+        organism_frame = ttk.Frame(root)
+        organism_frame.pack(fill="x", padx=20, pady=(5, 0))
+        ttk.Label(organism_frame, text="Organisms:").pack(side="left", padx=(0, 5))
+        self.organism_query_var = StringVar()
+        organism_entry = ttk.Entry(organism_frame, textvariable=self.organism_query_var)
+        organism_entry.pack(side="left", fill="x", expand=True)
+        organism_entry.bind("<Return>", self.run_organism_query)
+        ttk.Button(organism_frame, text="Find", command=self.run_organism_query).pack(side="left", padx=5)
+
+        # Outpost planning: planets covering a comma-separated list of resources, e.g. "Iron, Helium-3, Sealant"
+        outpost_frame = ttk.Frame(root)
+        outpost_frame.pack(fill="x", padx=20, pady=(5, 0))
+        ttk.Label(outpost_frame, text="Outpost targets:").pack(side="left", padx=(0, 5))
+        self.outpost_var = StringVar()
+        outpost_entry = ttk.Entry(outpost_frame, textvariable=self.outpost_var)
+        outpost_entry.pack(side="left", fill="x", expand=True)
+        outpost_entry.bind("<Return>", self.plan_outposts)
+        ttk.Button(outpost_frame, text="Plan", command=self.plan_outposts).pack(side="left", padx=5)
+
+        # Raw resources a crafted item takes, and where to find them
+        try:
+            self.recipes = RecipeBook.from_file()
+        except (OSError, RecipeError):
+            self.recipes = RecipeBook()
+        self.recipe_var = StringVar()
+        ttk.Label(outpost_frame, text="Recipe:").pack(side="left", padx=(15, 5))
+        ttk.Combobox(outpost_frame, textvariable=self.recipe_var, values=self.recipes.names(),
+                     state="readonly", width=20).pack(side="left")
+        ttk.Button(outpost_frame, text="Demand",
+                   command=lambda: self.show_recipe_demand(self.recipe_var.get())).pack(side="left", padx=5)
+
+        # Loading progress, removed once every planet is in
+        self.progress_frame = ttk.Frame(root)
+        self.progress_frame.pack(fill="x", padx=20, pady=(10, 0))
+        self.progress_label = ttk.Label(self.progress_frame, text="Loading planets...")
+        self.progress_label.pack(side="left")
+        self.progress = ttk.Progressbar(self.progress_frame, mode="determinate", maximum=1)
+        self.progress.pack(side="left", fill="x", expand=True, padx=5)
+
+        # Create and configure Treeview with Scrollbar
+        frame = ttk.Frame(root)
+        frame.pack(pady=20, padx=20)
+
+        self.tree = tree = ttk.Treeview(frame, columns=('Name', 'System', 'Type', 'Gravity', 'Temperature', 'Atmosphere', 'Magnetosphere'), show='headings')
+        for col in tree["columns"]:
+            tree.heading(col, text=col)
+            tree.column(col, width=120)
+
+        tree.bind("<Double-1>", self.on_planet_selected)  # Bind double click event
+
+        scrollbar = ttk.Scrollbar(frame, orient="vertical")
+        scrollbar.pack(side="right", fill="y")
+
+        # Detail rows of every resource, built once; each resource's color is a tag named after it
+        self.resource_rows = {}
+        for resource in list(inorg_resources_dict) + list(org_resources_dict):
+            self.register_resource(resource)
+        self.planet_detail_rows = {}  # row id -> that planet's resource rows, filled on first expand
+
+        # Long lists only keep the visible rows in the tree
+        self.planet_list = VirtualTreeview(tree, scrollbar, self.planet_values, self.planet_column)
+
+        tree.pack(fill="both", expand=True)
+
+        # Creating a Frame for resource buttons on the left side
+        button_frame = ttk.Frame(root)
+        button_frame.pack(side="left", fill="y", padx=10)
+
+        # Generate buttons for each resource in a grid layout; they work while planets are still loading
+        columns = 7
+        all_resources = list(inorg_resources_dict.keys()) + list(org_resources_dict.keys())
+        for idx, resource in enumerate(all_resources):
+            row = idx // columns
+            col = idx % columns
+            ttk.Button(button_frame, text=resource, command=lambda res=resource: self.filter_planets_by_resource(res)).grid(row=row, column=col, sticky="w", padx=5, pady=5)
+
+        # Add a reset button below the grid
+        ttk.Button(button_frame, text="Reset", command=self.reset_planet_view).grid(row=row+1, columnspan=columns, pady=20)
+
+        # Parse on a worker thread and hand results to the Tk thread through a queue
+        self.loader_queue = queue.Queue()
+        self.cancel_loading = threading.Event()
+        self.loader = threading.Thread(target=self.load_planets, daemon=True)
+        self.loader.start()
+        root.protocol("WM_DELETE_WINDOW", self.on_close)
+        root.after(POLL_MS, self.poll_loader)
+
+    def load_planets(self):
+        """Worker thread: open or compile the catalog and queue everything it yields."""
+        try:
+            for item in load_catalog_batches(cancel=self.cancel_loading):
+                self.loader_queue.put(item)
+        except Exception as e:
+            self.loader_queue.put(e)
+        self.loader_queue.put(None)  # end of loading
+
+    def poll_loader(self):
+        """Tk thread: take a few loader results off the queue and show them."""
+        for _ in range(BATCHES_PER_POLL):
+            try:
+                item = self.loader_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self.finish_loading()
+                return
+            if isinstance(item, Catalog):
+                self.catalog = item
+                # Organisms indexed from a freshly compiled catalog's builder are decoded from the catalog
+                self.organism_index.move_to(item)
+            elif isinstance(item, Exception):
+                messagebox.showerror("Loading planets", str(item))
+            else:
+                self.add_batch(item)
+        self.root.after(POLL_MS, self.poll_loader)
+
+    def add_batch(self, batch):
+        """Append a batch of planets to the table, the indexes and the current view."""
+        rows = range(batch.first_row, batch.first_row + len(batch.masks))
+        self.resource_index.extend_names(batch.resource_names)
+        self.store.extend_names(batch.resource_names)
+        self.organism_index.extend_names(batch.resource_names)
+        self.store.add_rows(rows, batch.columns, batch.masks)
+        self.resource_index.add_rows(zip(rows, batch.masks))
+        self.organism_query.add_organisms(batch.organisms, self.organism_index.add_organisms(batch.organisms))
+        self.planet_index.add_rows(zip(rows, batch.columns['system'], batch.columns['name']))
+        self.query_engine.add_rows(rows, batch.columns)
+        self.load_errors.extend(batch.errors)
+        self.planet_list.extend_rows(self.rows_in_view(rows))
+
+        self.progress["maximum"] = batch.total
+        self.progress["value"] = batch.done
+        self.progress_label.configure(text=f"Loading planets... {len(self.store)}")
+
+    def finish_loading(self):
+        """All planets are in: remove the progress bar and start watching the system files."""
+        self.progress_frame.pack_forget()
+        self.report_errors(self.load_errors)
+        if self.catalog is None:
+            return
+        self.next_row = len(self.catalog)
+        known = {}
+        for path, start, count, mtime_ns, size, _ in self.catalog.source_stamps():
+            if os.path.dirname(path) == os.path.normpath(SYSTEMS_DIRECTORY):
+                self.source_rows[path] = range(start, start + count)
+                known[path] = (mtime_ns, size)
+        self.watcher = DirectoryWatcher(SYSTEMS_DIRECTORY, known)
+        self.root.after(WATCH_MS, self.poll_watcher)
+
+    def report_errors(self, errors):
+        """Tell the user which system files were skipped and why."""
+        if errors:
+            messagebox.showwarning("Loading planets", "Some system files could not be read:\n\n" +
+                                   "\n".join(f"{os.path.basename(path)}: {message}" for path, message in errors))
+
+    def poll_watcher(self):
+        """Tk thread: reload the system files that changed since the last check."""
+        added, modified, deleted = self.watcher.poll()
+        if added or modified or deleted:
+            self.reload_sources(added + modified, deleted)
+        self.root.after(WATCH_MS, self.poll_watcher)
+
+    def reload_sources(self, changed, deleted):
+        """Re-parse only the changed system files and swap their planets in place.
+
+        Reloaded planets get fresh row ids after every id handed out so far, so ids of
+        untouched planets, and anything keyed by them, stay valid. The compiled catalog
+        is left alone; it is recompiled from the new files on the next start.
+        """
+        builder = CatalogBuilder(inorg_resources_dict, org_resources_dict, self.resource_index.resource_names)
+        parsed, deleted = [], list(deleted)
+        for path in changed:
+            try:
+                parsed.extend(parse_sources([path], SYSTEMS_DIRECTORY, workers=1))
+            except OSError:
+                deleted.append(path)  # gone again before we could read it
+
+        replacements = [(source[0], builder.add_source(*source)) for source in parsed]
+        replacements += [(path, range(0)) for path in deleted]
+        self.report_errors(builder.errors)
+        self.resource_index.extend_names(builder.resource_names)
+        self.store.extend_names(builder.resource_names)
+        self.organism_index.extend_names(builder.resource_names)
+
+        for path, built in replacements:
+            old_rows = list(self.source_rows.pop(path, ()))
+            new_rows = range(self.next_row, self.next_row + len(built))
+            self.next_row += len(built)
+            if len(built):
+                self.source_rows[path] = new_rows
+            columns = builder.summary_columns(built.start, built.stop)
+
+            # The indexes read masks from the store, so the new rows go in first
+            self.store.remove_rows(old_rows)
+            self.store.add_rows(new_rows, columns, builder.masks[built.start:built.stop])
+            self.query_engine.remove_rows(old_rows)
+            self.resource_index.replace_rows(old_rows, zip(new_rows, builder.masks[built.start:built.stop]))
+            self.planet_index.replace_rows(old_rows, zip(new_rows, columns['system'], columns['name']))
+            self.query_engine.add_rows(new_rows, columns)
+            organisms = builder.organism_columns(built.start, built.stop, new_rows.start)
+            self.organism_query.remove_ids(self.organism_index.remove_rows(old_rows))
+            self.organism_query.add_organisms(organisms, self.organism_index.add_organisms(organisms))
+            for row in old_rows:
+                self.planet_detail_rows.pop(row, None)
+            self.planet_list.replace_rows(old_rows, self.rows_in_view(new_rows))
+
+    def on_close(self):
+        """Stop a load that is still running and close the window."""
+        self.cancel_loading.set()
+        self.root.destroy()
+
+    def planet_values(self, row_id):
+        """Return the Treeview values of a top-level planet row."""
+        return self.store.values(row_id)
+
+    def planet_column(self, idx):
+        """Return {row id: value} for one planet list column, used for sorting."""
+        return self.store.column(PLANET_COLUMNS[idx])
+
+    def planet_row_of(self, item):
+        """Return the catalog row id of the planet a tree item belongs to.
+
+        Planet items use their row id as the Treeview iid, so this never searches the store.
+        """
+        while self.tree.parent(item):
+            item = self.tree.parent(item)
+        return int(item)
+
+    def register_resource(self, resource):
+        """Build a resource's detail row and register its color tag; returns the row values."""
+        details = resource_details(resource)
+        values = self.resource_rows[resource] = (resource,
+                                                 details.get("element_name", ""),
+                                                 details.get("rarity", ""),
+                                                 details.get("state_of_matter", ""),
+                                                 details.get("weight", ""),
+                                                 details.get("value", ""))
+        # Configure the row color based on the resource color in the JSON
+        self.tree.tag_configure(resource, background=details.get("color", "#FFFFFF"))  # default to white
+        return values
+
+    def detail_rows(self, row):
+        """Return a planet's (values, tags) resource rows, built on its first expansion."""
+        rows = self.planet_detail_rows.get(row)
+        if rows is None:
+            # Resources missing from the catalogs (e.g. "UNK") get their row the first time they show up
+            rows = self.planet_detail_rows[row] = tuple(
+                (self.resource_rows.get(resource) or self.register_resource(resource), (resource,))
+                for resource in self.resource_index.resources(row))
+        return rows
+
+    def on_planet_selected(self, event):
+        """Handle planet selection in the Treeview."""
+        tree = self.tree
+        item = tree.selection()[0]  # get selected item
+        selected_name = tree.item(item)["values"][0]
         parent_item = tree.parent(item)
-        if parent_item:
-            planet_name = tree.item(parent_item)["values"][0]
-        else:
-            print(f"{selected_name} not found in dataframe")
+        planet_row = self.planet_row_of(item)
+
+        # If the selected item has children already
+        if tree.get_children(item):
+            # If it has children (i.e., details have been previously loaded), remove them
+            with TreeBatch(tree) as batch:
+                batch.delete(*tree.get_children(item))
+            tree.after_idle(self.planet_list.refresh)
             return
 
-    planet_row = df[df['name'] == planet_name].iloc[0]
-
-    # Fetch fauna and flora
-    fauna = planet_row.get("fauna", [])
-    flora = planet_row.get("flora", [])
-
-    # If the selected item has children already
-    if tree.get_children(item):
-        # If it has children (i.e., details have been previously loaded), remove them
-        for child in tree.get_children(item):
-            tree.delete(child)
-        return
-    
-    # If double-clicked on an inorganic resource
-    if selected_name in inorg_resources_dict:
-        resource_name = selected_name
-        planet_name = tree.item(tree.parent(item))["values"][0]  # Get the planet's name
-        planet_data = df[df['name'] == planet_name].iloc[0]
-        resource_details = inorg_resources_dict.get(resource_name, {})
-        
-        # ... [Rest of the inorganic resource handling code]
-
-    # If double-clicked on an organic resource
-    elif selected_name in org_resources_dict:
-        resource_name = selected_name
-        planet_name = tree.item(tree.parent(item))["values"][0]  # Get the planet's name
-        planet_data = df[df['name'] == planet_name].iloc[0]
-        resource_details = org_resources_dict.get(resource_name, {})
-
-        # Insert subheaders for fauna/flora details
-        tree.insert(item, "end", text="", values=("Name", "Temperament", "Biomes", "Outpost"))
-
-        # Look for the fauna/flora that provides the resource
-        for fauna in planet_data.get("fauna", []):
-            if fauna["resources"].get(resource_name):
-                outpost_status = fauna.get("outpost", "UNK")
-                tree.insert(item, "end", text="", values=(fauna["name"], fauna["Temperament"], ', '.join(fauna["biomes"]), outpost_status))
-
-        for flora in planet_data.get("flora", []):
-            if flora["resources"].get(resource_name):
-                outpost_status = flora.get("outpost", "UNK")
-                tree.insert(item, "end", text="", values=(flora["name"], "", ', '.join(flora["biomes"]), outpost_status))
-
-    # If double-clicked on a planet
-    else:
-        planet_name = item_values[0]
-
-        # If the selected item is not in the dataframe, return early
-        if planet_name not in df['name'].values:
+        # If it's not a planet, then it might be a resource or a header.
+        if parent_item and selected_name in inorg_resources_dict:
+            # ... [Rest of the inorganic resource handling code]
+            pass
+
+        # If double-clicked on an organic resource
+        elif parent_item and selected_name in org_resources_dict:
+            resource_name = selected_name
+
+            with TreeBatch(tree) as batch:
+                # Insert subheaders for fauna/flora details
+                batch.insert(item, "end", values=ORGANISM_HEADER)
+
+                # The fauna/flora that provide the resource, looked up in the organism index; their
+                # details are decoded the first time an organism of their system is shown
+                for source in self.organism_index.planet_sources(planet_row, resource_name):
+                    batch.insert(item, "end", values=organism_values(source))
+
+        # If double-clicked on a planet
+        elif not parent_item:
+            with TreeBatch(tree) as batch:
+                # First, insert the sub-headers for resources
+                batch.insert(item, "end", values=RESOURCE_HEADER)
+
+                # Insert the resource details beneath the sub-headers, each tagged with its name for its color
+                for values, tags in self.detail_rows(planet_row):
+                    batch.insert(item, "end", values=values, tags=tags)
+
+        # Rows below this one moved, so the virtual window and scrollbar need placing again; after
+        # idle, once the Treeview's own double-click binding has toggled the item open or closed
+        tree.after_idle(self.planet_list.refresh)
+
+    def show_planets(self, rows, row_filter=None):
+        """Replace the planet list with the given rows; only the visible ones are materialized.
+
+        row_filter is given the row ids of planets added later, while loading or by a
+        reload, and returns the ones that join the list; without one, all of them do.
+        """
+        self.row_filter = row_filter
+        self.planet_list.set_rows(rows)
+
+    def rows_in_view(self, rows):
+        """Return the new rows that belong in the current planet list."""
+        return list(rows) if self.row_filter is None else self.row_filter(rows)
+
+    def same_planets(self, rows):
+        """Row filter for a fixed set of planets: new rows join if they are one of them again, e.g. after a reload."""
+        planet_key = lambda row: (self.store.value(row, 'system').casefold(), self.store.value(row, 'name').casefold())
+        keys = {planet_key(row) for row in rows}
+        return lambda new_rows: [row for row in new_rows if planet_key(row) in keys]
+
+    def filter_planets_by_resource(self, resource_name):
+        """Filter planets by the selected resource."""
+        self.show_planets(self.resource_index.lookup(resource_name),
+                          lambda rows: [row for row in rows if self.resource_index.has(row, resource_name)])
+
+    def show_farm_sources(self, resource_name):
+        """Open a window listing every organism, on any planet, that yields an organic resource."""
+        if resource_name:
+            self.show_organisms(f"Where to farm {resource_name}", "outpost-farmable ones first",
+                                self.organism_index.farm_sources(resource_name))
+
+    def run_organism_query(self, event=None):
+        """List the organisms matching the organism query and show the planets they live on."""
+        text = self.organism_query_var.get()
+        try:
+            bits = self.organism_query.evaluate(text)
+        except QuerySyntaxError as e:
+            messagebox.showerror("Organisms", str(e))
+            return
+        def row_filter(rows):
+            # Re-run the query, so organisms that arrived with the rows are matched too
+            planets = set(self.organism_query.planet_rows(self.organism_query.evaluate(text)))
+            return [row for row in rows if row in planets]
+        self.show_planets(self.organism_query.planet_rows(bits), row_filter)
+        self.show_organisms(f"Organisms: {text}", "double-click one to show its planet", self.organism_query.sources(bits))
+
+    def plan_outposts(self, event=None):
+        """Show the best single planets and the smallest planet sets covering the outpost targets."""
+        targets = [name for name in self.outpost_var.get().split(",") if name.strip()]
+        if not targets:
+            return
+        optimizer = self.outpost_optimizer
+        try:
+            ranked = optimizer.rank_planets(targets)
+        except ValueError as e:
+            messagebox.showerror("Outposts", str(e))
+            return
+        exact = optimizer.exact_cover(targets)
+        greedy = optimizer.greedy_cover(targets)
+
+        window = Toplevel(self.root)
+        window.title("Outpost plan")
+        note = f"Missing everywhere: {', '.join(exact.missing)}" if exact.missing else "Every target can be covered"
+        ttk.Label(window, text=note).pack(anchor="w", padx=10, pady=(10, 0))
+        plan_tree = ttk.Treeview(window, columns=OUTPOST_COLUMNS, show='headings')
+        for col in OUTPOST_COLUMNS:
+            plan_tree.heading(col, text=col)
+            plan_tree.column(col, width=120)
+        scrollbar = ttk.Scrollbar(window, orient="vertical", command=plan_tree.yview)
+        plan_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        plan_tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+        plan_rows = {}  # tree iid -> planet row ids the line stands for
+        plans = [(f"Smallest set ({len(exact.rows)} planets)", exact)]
+        if len(greedy.rows) > len(exact.rows):
+            plans.append((f"Greedy set ({len(greedy.rows)} planets)", greedy))
+        plans += [("Single planet", plan) for plan in ranked]
+        with TreeBatch(plan_tree) as batch:
+            for idx, (label, plan) in enumerate(plans):
+                iid = str(idx)
+                plan_rows[iid] = plan.rows
+                batch.insert("", "end", iid, (label, "", "", ', '.join(plan.covered), plan.score))
+                for row in plan.rows:
+                    plan_rows[f"{iid}.{row}"] = [row]
+                    batch.insert(iid, "end", f"{iid}.{row}", ("", self.store.value(row, 'name'), self.store.value(row, 'system'),
+                                                              ', '.join(plan.row_covers[row]), ""))
+
+        def show_plan_planets(event):
+            # Double-clicking a plan or one of its planets shows those planets in the planet list
+            selection = plan_tree.selection()
+            if selection:
+                rows = sorted(plan_rows[selection[0]])
+                self.show_planets(rows, self.same_planets(rows))
+        plan_tree.bind("<Double-1>", show_plan_planets)
+
+    def show_recipe_demand(self, item):
+        """Open a window with the raw resources an item takes and the planets offering each."""
+        if not item:
+            return
+        try:
+            demand = self.recipes.expand(item)
+        except RecipeError as e:
+            messagebox.showerror("Recipes", str(e))
+            return
+        sources = self.recipes.sources(demand, self.resource_index)
+
+        window = Toplevel(self.root)
+        window.title(f"Resources for {item}")
+        demand_tree = ttk.Treeview(window, columns=DEMAND_COLUMNS, show='headings')
+        for col in DEMAND_COLUMNS:
+            demand_tree.heading(col, text=col)
+            demand_tree.column(col, width=120)
+        scrollbar = ttk.Scrollbar(window, orient="vertical", command=demand_tree.yview)
+        demand_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        demand_tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+        with TreeBatch(demand_tree) as batch:
+            for idx, (resource, quantity) in enumerate(demand.items()):
+                rows = sources[resource]
+                batch.insert("", "end", str(idx), (resource, quantity, f"{len(rows)} planets" if rows else "not found", ""))
+                for row in rows:
+                    batch.insert(str(idx), "end", values=("", "", self.store.value(row, 'name'), self.store.value(row, 'system')))
+
+        found = [resource for resource in demand if sources[resource]]
+        if found:
+            # Hand the resources that can be found to the outpost planner
+            ttk.Button(window, text="Plan outposts for these", command=lambda: (
+                self.outpost_var.set(", ".join(found)), self.plan_outposts())).pack(pady=(0, 10))
+
+    def show_organisms(self, title, note, sources):
+        """Open a window listing OrganismSource entries with their planets."""
+        window = Toplevel(self.root)
+        window.title(title)
+        ttk.Label(window, text=f"{len(sources)} sources; {note}").pack(anchor="w", padx=10, pady=(10, 0))
+        organism_tree = ttk.Treeview(window, columns=ORGANISM_COLUMNS, show='headings')
+        for col in ORGANISM_COLUMNS:
+            organism_tree.heading(col, text=col)
+            organism_tree.column(col, width=120)
+        scrollbar = ttk.Scrollbar(window, orient="vertical", command=organism_tree.yview)
+        organism_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        organism_tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+        with TreeBatch(organism_tree) as batch:
+            for idx, source in enumerate(sources):
+                outpost = "UNK" if source.outpost is None else source.outpost
+                batch.insert("", "end", str(idx), (source.name, "Fauna" if source.kind == FAUNA else "Flora",
+                                                   self.store.value(source.row, 'name'),
+                                                   self.store.value(source.row, 'system'),
+                                                   ', '.join(source.biomes), outpost))
+
+        def show_source_planet(event):
+            # Double-clicking a source shows its planet in the planet list
+            selection = organism_tree.selection()
+            if selection:
+                rows = [sources[int(selection[0])].row]
+                self.show_planets(rows, self.same_planets(rows))
+        organism_tree.bind("<Double-1>", show_source_planet)
+
+    def run_query(self, event=None):
+        """Filter planets with the boolean query typed into the query bar."""
+        text = self.query_var.get()
+        try:
+            rows = self.query_engine.query(text)
+        except QuerySyntaxError as e:
+            messagebox.showerror("Query", str(e))
             return
-        
-        # First, insert the sub-headers for resources
-        tree.insert(item, "end", text="", values=("Resource Name", "Element", "Rarity", "State", "Weight", "Value"))
-        
-        # Fetch resources for the planet
-        planet_row = df[df['name'] == planet_name].iloc[0]
-        resources = planet_row['resources']
-
-        # Extract resource names based on 'true' values
-        available_resources = [resource for resource, available in resources.items() if available]
-
-        # Insert the resource details beneath the sub-headers
-        for resource in available_resources:
-            if resource in inorg_resources_dict:
-                resource_details = inorg_resources_dict.get(resource, {})
-            else:
-                resource_details = org_resources_dict.get(resource, {})
-
-            details_values = (resource, 
-                              resource_details.get("element_name", ""), 
-                              resource_details.get("rarity", ""),
-                              resource_details.get("state_of_matter", ""),
-                              resource_details.get("weight", ""),
-                              resource_details.get("value", ""))
-            
-            # Insert the resource with a tag equal to its name
-            tree.insert(item, "end", text="", values=details_values, tags=(resource,))
-            
-            # Configure the row color based on the resource color in the JSON
-            color = resource_details.get("color", "#FFFFFF")  # default to white if no color is specified
-            tree.tag_configure(resource, background=color)
-
-
-
-
-
-
-def filter_planets_by_resource(resource_name):
-    """Filter planets by the selected resource."""
-    tree.delete(*tree.get_children())  # Clear the current tree view
-    filtered_data = df[df['resources'].apply(lambda x: x.get(resource_name, False))]
-
-    for _, row in filtered_data.iterrows():
-        tree.insert("", "end", values=(row['name'], row.get('type', ''), row.get('gravity', ''), row.get('temperature', ''), row.get('atmosphere', ''), row.get('magnetosphere', '')))
-
-def reset_planet_view():
-    """Reset the planet view to show all planets."""
-    tree.delete(*tree.get_children())  # Clear the current tree view
-    for _, row in df.iterrows():
-        tree.insert("", "end", values=(row['name'], row.get('type', ''), row.get('gravity', ''), row.get('temperature', ''), row.get('atmosphere', ''), row.get('magnetosphere', '')))
-
-
-
-# Load data from all JSON files within the "systems" directory
-data = []
-systems_directory = 'systems'
 
-for file in os.listdir(systems_directory):
-    if file.endswith(".json"):
-        filepath = os.path.join(systems_directory, file)
-        with open(filepath, 'r') as f:
+        def row_filter(rows):
+            # Re-run the query, as the bitsets now cover the new rows
             try:
-                content_json = json.loads(f.read())
-                content_json = lowercase_keys(content_json)
-                for system_data in content_json['systems']:
-                    for planet in system_data['planets']:
-                        # Extract resources from fauna and flora
-                        fauna_resources = {res: True for fauna in planet.get('fauna', []) for res, val in fauna.get('resources', {}).items() if val}
-                        flora_resources = {res: True for flora in planet.get('flora', []) for res, val in flora.get('resources', {}).items() if val}
-
-                        # Merge these with main resources
-                        merged_resources = {**planet['resources'], **fauna_resources, **flora_resources}
-                        planet['resources'] = merged_resources
-
-                        data.append(planet)
-            except (json.JSONDecodeError, KeyError):
-                # Here, you might want to print the error and/or the file content for debugging
-                continue
-
-df = pd.DataFrame(data)
-
-# Create tkinter window
-root = Tk()
-root.title("Planet Details")
-root.geometry("800x400")
-
-
-
-# Create and configure Treeview with Scrollbar
-frame = ttk.Frame(root)
-frame.pack(pady=20, padx=20)
-
-tree = ttk.Treeview(frame, columns=('Name', 'Type', 'Gravity', 'Temperature', 'Atmosphere', 'Magnetosphere'), show='headings')
-for col in tree["columns"]:
-    tree.heading(col, text=col)
-    tree.column(col, width=120)
-    
-# Populate Treeview with planet data
-for _, row in df.iterrows():
-    tree.insert("", "end", values=(row['name'], row.get('type', ''), row.get('gravity', ''), row.get('temperature', ''), row.get('atmosphere', ''), row.get('magnetosphere', '')))
-
-tree.bind("<Double-1>", on_planet_selected)  # Bind double click event
-
-scrollbar = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
-tree.configure(yscrollcommand=scrollbar.set)
-scrollbar.pack(side="right", fill="y")
-
-tree.pack(fill="both", expand=True)
-
-# Creating a Frame for resource buttons on the left side
-button_frame = ttk.Frame(root)
-button_frame.pack(side="left", fill="y", padx=10)
-
-# Generate buttons for each resource in a grid layout
-columns = 7
-all_resources = list(inorg_resources_dict.keys()) + list(org_resources_dict.keys())
-for idx, resource in enumerate(all_resources):
-    row = idx // columns
-    col = idx % columns
-    ttk.Button(button_frame, text=resource, command=lambda res=resource: filter_planets_by_resource(res)).grid(row=row, column=col, sticky="w", padx=5, pady=5)
-
-# Add a reset button below the grid
-ttk.Button(button_frame, text="Reset", command=reset_planet_view).grid(row=row+1, columnspan=columns, pady=20)
-
-root.mainloop()
+                bits = self.query_engine.evaluate(text)
+            except QuerySyntaxError:
+                return []  # e.g. a planet named in the query was reloaded away
+            return [row for row in rows if bits >> row & 1]
+        self.show_planets(rows, row_filter)
+
+    def reset_planet_view(self):
+        """Reset the planet view to show all planets."""
+        self.show_planets(self.store.index)
+
+
+if __name__ == "__main__":
+    # Create tkinter window
+    root = Tk()
+    viewer = PlanetViewer(root)
+    root.mainloop()
@@ -0,0 +1,285 @@
+"""Headless startup benchmark for the planet viewer's load path.
+
+Generates synthetic Systems/*.json folders of 10 to 10,000 planets, times each load
+stage separately and writes a JSON report that can be diffed between commits:
+
+    python starfieldpedia_bench.py --sizes 10 1000 10000 --output bench.json
+    python starfieldpedia_bench.py --profile profiles --tracemalloc
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+import cProfile
+
+from starfieldpedia_catalog import (RESOURCES_DIRECTORY, Catalog, CatalogBuilder, ingest_sources, lowercase_keys,
+                                    load_resource_catalogs, parse_system_file, source_paths, _parse_source)
+from starfieldpedia_index import PlanetIndex, ResourceIndex
+from starfieldpedia_query import QueryEngine
+from starfieldpedia_store import PLANET_COLUMNS, PlanetStore
+from starfieldpedia_stream import normalize_pairs
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+DEFAULT_REPEAT = 3
+PLANETS_PER_SYSTEM = 8
+SEED = 1
+
+# Attribute values as they appear in the real system files
+PLANET_TYPES = ("Rock", "Barren", "Ice", "Gas Giant", "Ice Giant", "Asteroid")
+TEMPERATURES = ("Frozen", "Deep Freeze", "Cold", "Temperate", "Hot", "Scorched", "Inferno")
+ATMOSPHERES = ("None", "STD O2", "Thin CO2", "High O2", "EXTR CO2", "STD M", "Thin N2")
+MAGNETOSPHERES = ("None", "Very Weak", "Weak", "Average", "Strong", "Powerful", "Massive")
+BIOMES = ("Swamp", "Rocky Desert", "Wetlands", "Mountains", "Coniferous Forest", "Deciduous Forest",
+          "Frozen Plains", "Frozen Mountains", "Savanna", "Ocean")
+TEMPERAMENTS = ("Wary", "Fearless", "Skittish", "Peaceful", "Territorial", "Aggressive")
+
+
+def synthetic_planet(rng, name, inorganic, organic):
+    """Return one planet shaped like the entries of Systems/*.json."""
+    planet = {
+        "name": name,
+        "type": rng.choice(PLANET_TYPES),
+        "gravity": round(rng.uniform(0.05, 3.0), 2),
+        "temperature": rng.choice(TEMPERATURES),
+        "atmosphere": rng.choice(ATMOSPHERES),
+        "magnetosphere": rng.choice(MAGNETOSPHERES),
+        "traits": ["UNK"],
+        "resources": {res: True for res in rng.sample(inorganic, rng.randint(2, 8))},
+    }
+    if rng.random() < 0.4:
+        planet["fauna"] = [{"name": f"{name} Fauna {i}", "Temperament": rng.choice(TEMPERAMENTS),
+                            "biomes": rng.sample(BIOMES, rng.randint(1, 4)),
+                            "resources": {rng.choice(organic): True}}
+                           for i in range(rng.randint(1, 8))]
+        planet["flora"] = [{"name": f"{name} Flora {i}", "biomes": rng.sample(BIOMES, rng.randint(1, 4)),
+                            "resources": {rng.choice(organic): True}}
+                           for i in range(rng.randint(1, 6))]
+    return planet
+
+
+def generate_dataset(directory, planet_count, resources_directory=RESOURCES_DIRECTORY, seed=SEED):
+    """Write a Systems folder with planet_count planets and a copy of the resource catalogs."""
+    rng = random.Random(seed)
+    inorganic, organic = (list(catalog) for catalog in load_resource_catalogs(resources_directory))
+    systems_directory = os.path.join(directory, "Systems")
+    os.makedirs(systems_directory)
+    shutil.copytree(resources_directory, os.path.join(directory, "Resources"))
+    for start in range(0, planet_count, PLANETS_PER_SYSTEM):
+        system_name = f"Synthetic {start // PLANETS_PER_SYSTEM:05d}"
+        planets = [synthetic_planet(rng, f"{system_name} {i + 1}", inorganic, organic)
+                   for i in range(min(PLANETS_PER_SYSTEM, planet_count - start))]
+        with open(os.path.join(systems_directory, f"synthetic_{start // PLANETS_PER_SYSTEM:05d}.json"), 'w') as f:
+            json.dump({"systems": [{"Name": system_name, "planets": planets}]}, f, indent=4)
+    return systems_directory, os.path.join(directory, "Resources")
+
+
+class StageTimer:
+    """Best-of-N wall time per stage, plus optional tracemalloc peaks and cProfile output."""
+
+    def __init__(self, repeat=DEFAULT_REPEAT, trace_memory=False, profile=None):
+        self.repeat = repeat
+        self.trace_memory = trace_memory
+        self.profile = profile
+        self.stages = {}
+
+    def run(self, name, func):
+        """Time func() repeat times and return its last result."""
+        best = None
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        stage = self.stages[name] = {"seconds": round(best, 6)}
+
+        if self.trace_memory:
+            tracemalloc.start()
+            func()
+            stage["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        if self.profile is not None:
+            profiler = cProfile.Profile()
+            profiler.runcall(func)
+            profiler.dump_stats(f"{self.profile}-{name}.prof")
+        return result
+
+    def skip(self, name, reason):
+        self.stages[name] = {"skipped": reason}
+
+
+def populate_tree(columns, rows):
+    """Insert every planet into a Treeview on a hidden root, as the viewer did before virtualizing."""
+    from tkinter import Tk, TclError, ttk
+    try:
+        root = Tk()
+    except TclError as e:
+        return str(e)
+    try:
+        root.withdraw()
+        tree = ttk.Treeview(root, columns=PLANET_COLUMNS, show='headings')
+        for row in rows:
+            tree.insert("", "end", iid=str(row), values=tuple(columns[column][row] for column in PLANET_COLUMNS))
+        root.update_idletasks()
+    finally:
+        root.destroy()
+    return None
+
+
+def bench_size(planet_count, timer, workdir, processes=None):
+    """Run every stage against one synthetic dataset and return the timer's stages."""
+    directory = os.path.join(workdir, f"planets-{planet_count}")
+    systems_directory, resources_directory = generate_dataset(directory, planet_count)
+    catalog_path = os.path.join(directory, "starfieldpedia.catalog")
+    inorganic, organic = load_resource_catalogs(resources_directory)
+    processes = processes or os.cpu_count() or 1
+
+    paths = timer.run("scan", lambda: source_paths(systems_directory, resources_directory))
+    system_paths = paths[2:]
+
+    def read():
+        contents = []
+        for path in system_paths:
+            with open(path, 'rb') as f:
+                contents.append(f.read())
+        return contents
+    contents = timer.run("read", read)
+    documents = timer.run("json_parse", lambda: [json.loads(content) for content in contents])
+    timer.run("lowercase_keys", lambda: [lowercase_keys(document) for document in documents])
+    timer.run("normalized_parse", lambda: [json.loads(content, object_pairs_hook=normalize_pairs)
+                                          for content in contents])
+    timer.run("stream_parse", lambda: [parse_system_file(path) for path in system_paths])
+
+    def merge():
+        # Planet masks include their fauna's and flora's resources
+        builder = CatalogBuilder(inorganic, organic)
+        for document in documents:
+            for system in document["systems"]:
+                for planet in system["planets"]:
+                    mask = builder.resource_mask(planet.get("resources", {}))
+                    for organism in planet.get("fauna", []) + planet.get("flora", []):
+                        mask |= builder.resource_mask(organism.get("resources", {}))
+    timer.run("organism_merge", merge)
+
+    parsed = [_parse_source(path, True) for path in system_paths]
+
+    def build():
+        builder = CatalogBuilder(inorganic, organic)
+        for source in parsed:
+            builder.add_source(*source)
+        return builder
+    builder = timer.run("catalog_build", build)
+
+    def ingest(processes, cache_directory=None):
+        # Parse and build in one go, as a cold start does
+        builder = CatalogBuilder(inorganic, organic)
+        for _ in ingest_sources(builder, system_paths, systems_directory, processes=processes,
+                                cache_directory=cache_directory):
+            pass
+    timer.run("ingest", lambda: ingest(1))
+    if processes > 1:
+        timer.run("parallel_ingest", lambda: ingest(processes))
+    else:
+        timer.skip("parallel_ingest", "one worker process")
+    cache_directory = os.path.join(directory, "cache")
+    ingest(1, cache_directory)
+    timer.run("cached_ingest", lambda: ingest(1, cache_directory))
+    timer.run("catalog_write", lambda: builder.write(catalog_path))
+
+    def open_catalog():
+        catalog = Catalog(catalog_path)
+        columns = catalog.summary_columns()
+        masks = [catalog.mask(row) for row in range(len(catalog))]
+        catalog.close()
+        return columns, masks
+    columns, masks = timer.run("catalog_open", open_catalog)
+    rows = range(len(masks))
+    resource_names = builder.resource_names
+
+    def store():
+        planet_store = PlanetStore(resource_names)
+        planet_store.add_rows(rows, columns, masks)
+        return planet_store
+    planet_store = timer.run("store_build", store)
+
+    def indexes():
+        resource_index = ResourceIndex(resource_names, planet_store)
+        resource_index.add_rows(zip(rows, masks))
+        planet_index = PlanetIndex()
+        planet_index.add_rows(zip(rows, columns['system'], columns['name']))
+        QueryEngine(resource_index, planet_index).add_rows(rows, columns)
+    timer.run("index_build", indexes)
+
+    try:
+        import pandas as pd
+    except ImportError:
+        timer.skip("dataframe_build", "pandas is not installed")
+    else:
+        timer.run("dataframe_build", lambda: pd.DataFrame(columns, index=rows))
+
+    if not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+        timer.skip("tree_populate", "no display")
+    else:
+        error = populate_tree(columns, rows)
+        if error is None:
+            timer.run("tree_populate", lambda: populate_tree(columns, rows))
+        else:
+            timer.skip("tree_populate", error)
+
+    report = {"planets": planet_count, "files": len(system_paths), "store_bytes": planet_store.memory_usage(),
+              "stages": timer.stages}
+    report["total_seconds"] = round(sum(stage.get("seconds", 0) for stage in timer.stages.values()), 6)
+    return report
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="planet counts to generate")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="runs per stage; the best is kept")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--profile", metavar="DIR", help="dump a cProfile .prof file per size and stage")
+    parser.add_argument("--processes", type=int, help="worker processes for parallel_ingest (default: every core)")
+    parser.add_argument("--tracemalloc", action="store_true", help="record each stage's peak allocation")
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        os.makedirs(args.profile, exist_ok=True)
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            profile = os.path.join(args.profile, f"planets-{size}") if args.profile else None
+            timer = StageTimer(args.repeat, args.tracemalloc, profile)
+            results.append(bench_size(size, timer, workdir, args.processes))
+            print(f"{size} planets: {results[-1]['total_seconds']:.3f}s", file=sys.stderr)
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+import pickle
+import tempfile
+
+CACHE_DIRECTORY = "starfieldpedia.cache"
+# Total size the cache is trimmed back to, least recently used entries first.
+CACHE_MAX_BYTES = 256 << 20
+# Bump whenever the shape of cached values changes; entries of other versions are never read.
+CACHE_VERSION = 2
+ENTRY_SUFFIX = f".v{CACHE_VERSION}"
+
+
+class SourceCache:
+    """Content-addressed cache of compiled system files, one pickle per file sha1.
+
+    Entries are written to a temporary file and renamed into place, so launches
+    sharing the directory only ever see complete entries; a torn or unreadable
+    entry is treated as a miss and removed. Every hit touches the entry's mtime,
+    which is what trimming orders by.
+    """
+
+    def __init__(self, directory=CACHE_DIRECTORY, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size = None  # bytes on disk as of the last scan plus what we wrote since
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest.hex() + ENTRY_SUFFIX)
+
+    def get(self, digest):
+        """Return the value cached for a sha1 digest, or None."""
+        path = self._path(digest)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, digest, value):
+        """Store a value under a sha1 digest; failures only cost a cache miss later."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=".", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    written = f.tell()
+                os.replace(temp_path, self._path(digest))
+            except BaseException:
+                self._remove(temp_path)
+                raise
+        except OSError:
+            return
+        if self._size is not None:
+            self._size += written
+        if self._size is None or self._size > self.max_bytes:
+            self.trim()
+
+    def trim(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        try:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if entry.name.startswith(".") or not entry.is_file():
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue  # evicted by another launch
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        except OSError:
+            return
+        entries.sort()
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._size <= self.max_bytes:
+                break
+            self._remove(path)
+            self._size -= size
+
+    def clear(self):
+        """Delete every entry."""
+        max_bytes, self.max_bytes = self.max_bytes, -1
+        self.trim()
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,863 @@
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+import tempfile
+import io
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from starfieldpedia_cache import CACHE_DIRECTORY, SourceCache
+from starfieldpedia_index import OrganismColumns, iter_bits
+from starfieldpedia_stream import JsonStream, iter_system_planets
+
+SYSTEMS_DIRECTORY = "Systems"
+RESOURCES_DIRECTORY = "Resources"
+INORGANIC_RESOURCES_FILE = "inorganic_resources.json"
+ORGANIC_RESOURCES_FILE = "organic_resources.json"
+CATALOG_PATH = "starfieldpedia.catalog"
+
+# Bump CATALOG_VERSION whenever the layout below changes; older files are rebuilt.
+CATALOG_MAGIC = b"SFPCAT\x00\x00"
+CATALOG_VERSION = 4
+BYTEORDER = 1 if sys.byteorder == "little" else 2
+
+# Header: magic, version, byte order, number of sections.
+HEADER = struct.Struct("<8sHHI")
+# Section table entry: 4-byte tag, offset, length.
+SECTION = struct.Struct("<4sQQ")
+# Source stamp: path string id, first planet row, planet count, mtime_ns, size, sha1.
+SOURCE = struct.Struct("<IIIqq20s")
+# Manifest entry: system name string id, source index, first planet row, planet count,
+# first organism id, organism count.
+SYSTEM = struct.Struct("<IIIIII")
+
+FAUNA = 0
+FLORA = 1
+OUTPOST_UNKNOWN = -1
+
+# Planets handed to the viewer per batch while streaming an existing catalog.
+BATCH_ROWS = 500
+
+# System files larger than this are parsed a planet at a time as they are compiled.
+STREAM_ABOVE = 16 << 20
+
+# With processes=None, system folders of at least this many files are compiled on a
+# process pool; below it starting the workers costs more than it saves.
+PROCESS_POOL_ABOVE = 64
+# Shards handed to each worker process; more shards smooth out uneven file sizes.
+SHARDS_PER_PROCESS = 4
+
+# A slice of planets for progressive display: row ids start at first_row, columns holds
+# the summary attributes, masks the resource bitmasks; done/total measure progress.
+# errors lists (path, message) for the files of the batch that could not be parsed and
+# organisms holds the OrganismColumns of the batch's fauna and flora.
+PlanetBatch = namedtuple('PlanetBatch', 'first_row columns masks resource_names done total errors organisms')
+# One source file as read by parse_sources; error is None or why its planets are missing.
+ParsedSource = namedtuple('ParsedSource', 'path stat digest planets error')
+SystemEntry = namedtuple('SystemEntry', 'name source first_row planet_count first_organism organism_count')
+
+# Planet string columns and the record keys they are exposed under.
+PLANET_STRING_COLUMNS = (
+    (b"PTYP", "type"),
+    (b"PTMP", "temperature"),
+    (b"PATM", "atmosphere"),
+    (b"PMAG", "magnetosphere"),
+)
+
+
+class CatalogError(Exception):
+    """Raised when a catalog file is missing, truncated, from another version or cannot be replaced."""
+
+
+def lowercase_keys(input_dict):
+    """Recursively convert all keys in dictionary to lowercase."""
+    if not isinstance(input_dict, dict):
+        return input_dict
+
+    return {k.lower(): lowercase_keys(v) for k, v in input_dict.items()}
+
+
+def load_resource_catalogs(resources_directory=RESOURCES_DIRECTORY):
+    """Load the inorganic and organic resource catalogs."""
+    with open(os.path.join(resources_directory, INORGANIC_RESOURCES_FILE), 'r') as inorg_file:
+        inorganic = json.load(inorg_file)
+    with open(os.path.join(resources_directory, ORGANIC_RESOURCES_FILE), 'r') as org_file:
+        organic = json.load(org_file)
+    return inorganic, organic
+
+
+def source_paths(systems_directory=SYSTEMS_DIRECTORY, resources_directory=RESOURCES_DIRECTORY):
+    """Return every file the catalog depends on, resource catalogs first."""
+    paths = [os.path.join(resources_directory, INORGANIC_RESOURCES_FILE),
+             os.path.join(resources_directory, ORGANIC_RESOURCES_FILE)]
+    paths += sorted(os.path.join(systems_directory, file)
+                    for file in os.listdir(systems_directory) if file.endswith(".json"))
+    return [os.path.normpath(path) for path in paths]
+
+
+def file_digest(path):
+    """Return the sha1 digest of a file's contents."""
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(chunk)
+    return sha1.digest()
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _mask_bytes(resource_count):
+    """Width in bytes of a resource bitmask, padded to whole 64-bit words."""
+    return max(8, (resource_count + 63) // 64 * 8)
+
+
+def parse_system_file(filepath):
+    """Parse one system file into (system name, planet) pairs."""
+    with open(filepath, 'rb') as f:
+        return list(iter_system_planets(JsonStream(f)))
+
+
+def _parse_source(path, is_system):
+    """Stat, hash and (for system files) parse one source file."""
+    with open(path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        stream = JsonStream(f)
+        planets, error = [], None
+        if is_system:
+            try:
+                planets = list(iter_system_planets(stream))
+            except ValueError as e:
+                planets, error = [], str(e)
+        stream.drain()
+    return ParsedSource(path, stat, stream.digest, planets, error)
+
+
+def _stream_source(path):
+    """Like _parse_source for a system file, but planets are parsed as they are consumed.
+
+    The digest and error are returned as callables, valid once the planets have
+    been read. Planets before a syntax error are kept.
+    """
+    f = open(path, 'rb')
+    stat = os.fstat(f.fileno())
+    stream = JsonStream(f)
+    errors = []
+
+    def planets():
+        with f:
+            try:
+                yield from iter_system_planets(stream)
+            except ValueError as e:
+                errors.append(str(e))
+            stream.drain()
+    return ParsedSource(path, stat, lambda: stream.digest, planets(), lambda: errors[0] if errors else None)
+
+
+def parse_sources(paths, systems_directory=SYSTEMS_DIRECTORY, workers=None, cancel=None):
+    """Parse source files on a thread pool, yielding ParsedSource tuples in path order.
+
+    System files over STREAM_ABOVE bytes are not parsed ahead on the pool; their
+    planets are streamed straight into whoever consumes them, in bounded memory.
+    """
+    systems_directory = os.path.normpath(systems_directory)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for path in paths:
+            is_system = os.path.dirname(path) == systems_directory
+            if is_system and os.path.getsize(path) > STREAM_ABOVE:
+                futures.append(path)
+            else:
+                futures.append(pool.submit(_parse_source, path, is_system))
+        try:
+            for future in futures:
+                if cancel is not None and cancel.is_set():
+                    return
+                yield _stream_source(future) if isinstance(future, str) else future.result()
+        finally:
+            for future in futures:
+                if not isinstance(future, str):
+                    future.cancel()
+
+
+def _compile_source(path, is_system, names, cache=None):
+    """Compile one source file into a builder of its own, served from cache when unchanged.
+
+    names is (inorganic, organic, resource_names) for seeding the builder.
+    """
+    with open(path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        streamed = is_system and stat.st_size > STREAM_ABOVE
+        content = None if streamed else f.read()
+    digest = file_digest(path) if streamed else hashlib.sha1(content).digest()
+    if is_system and cache is not None:
+        builder = cache.get(digest)
+        if builder is not None:
+            builder.restamp_source(0, path, stat)
+            return builder
+
+    builder = CatalogBuilder(*names)
+    if streamed:
+        builder.add_source(*_stream_source(path))
+    elif is_system:
+        try:
+            planets, error = list(iter_system_planets(JsonStream(io.BytesIO(content)))), None
+        except ValueError as e:
+            planets, error = [], str(e)
+        builder.add_source(path, stat, digest, planets, error)
+    else:
+        builder.add_source(path, stat, digest, [])
+    if is_system and cache is not None:
+        cache.put(builder.source_digest(0), builder)
+    return builder
+
+
+def _build_shard(paths, systems_directory, names, cache):
+    """Worker process: compile a run of source files into a builder of their own."""
+    builder = CatalogBuilder(*names)
+    systems_directory = os.path.normpath(systems_directory)
+    for path in paths:
+        builder.extend(_compile_source(path, os.path.dirname(path) == systems_directory, names, cache))
+    return builder
+
+
+def ingest_sources(builder, paths, systems_directory=SYSTEMS_DIRECTORY, workers=None, processes=None,
+                   cancel=None, cache_directory=CACHE_DIRECTORY):
+    """Add source files to a builder, yielding (row range, files done) as planets arrive.
+
+    Every system file is compiled on its own and kept in a SourceCache under
+    cache_directory (None disables it), keyed by content, so an unchanged file is
+    never parsed twice. processes picks the worker-process count; 0 or 1 compiles
+    on threads in this process, and None uses every core once there are
+    PROCESS_POOL_ABOVE files or more. With a process pool the files are split into
+    contiguous shards that are compiled in the workers and merged back in order,
+    so row ids are the same either way. Files that cannot be parsed are listed in
+    builder.errors.
+    """
+    cache = None if cache_directory is None else SourceCache(cache_directory)
+    inorganic = builder.resource_names[:builder.inorganic_count]
+    organic = builder.resource_names[builder.inorganic_count:builder.inorganic_count + builder.organic_count]
+    names = (inorganic, organic, builder.resource_names)
+    if processes is None:
+        processes = (os.cpu_count() or 1) if len(paths) >= PROCESS_POOL_ABOVE else 1
+    if processes <= 1:
+        systems_directory = os.path.normpath(systems_directory)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_compile_source, path, os.path.dirname(path) == systems_directory, names, cache)
+                       for path in paths]
+            try:
+                for done, future in enumerate(futures, 1):
+                    if cancel is not None and cancel.is_set():
+                        return
+                    yield builder.extend(future.result()), done
+            finally:
+                for future in futures:
+                    future.cancel()
+        return
+
+    shard_size = max(1, -(-len(paths) // (processes * SHARDS_PER_PROCESS)))
+    shards = [paths[start:start + shard_size] for start in range(0, len(paths), shard_size)]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(_build_shard, shard, systems_directory, names, cache) for shard in shards]
+        try:
+            done = 0
+            for shard, future in zip(shards, futures):
+                if cancel is not None and cancel.is_set():
+                    return
+                done += len(shard)
+                yield builder.extend(future.result()), done
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+class PlanetColumns:
+    """Record-shaped accessors shared by the compiled Catalog and a CatalogBuilder.
+
+    Subclasses provide string(sid), mask(row), organism_mask(idx), resource_names,
+    the planet and organism columns and the system manifest.
+    """
+
+    def mask_resources(self, mask):
+        """Return the resource names set in a bitmask."""
+        names = []
+        bit = 0
+        while mask:
+            if mask & 1:
+                names.append(self.resource_names[bit])
+            mask >>= 1
+            bit += 1
+        return names
+
+    def traits(self, row):
+        return [self.string(sid) for sid in self._traits[self._trait_offsets[row]:self._trait_offsets[row + 1]]]
+
+    def organism_range(self, row):
+        """Return the range of organism ids living on a planet."""
+        return range(self._organism_offsets[row], self._organism_offsets[row + 1])
+
+    def organism_biomes(self, idx):
+        return [self.string(sid) for sid in self._biomes[self._biome_offsets[idx]:self._biome_offsets[idx + 1]]]
+
+    def system_organisms(self, idx):
+        """Return the range of organism ids of the manifest entry organism idx belongs to."""
+        entry = self.manifest[bisect_right(self._manifest_organisms, idx) - 1]
+        return range(entry[4], entry[4] + entry[5])
+
+    def organism_details(self, idx):
+        """Return (name, temperament, biomes) of one organism; temperament is '' for flora."""
+        fauna = self.organism_kinds[idx] == FAUNA
+        return (self.string(self.organism_names[idx]),
+                self.string(self.organism_temperaments[idx]) if fauna else "",
+                tuple(self.organism_biomes(idx)))
+
+    def organism(self, idx):
+        """Return one organism as a dictionary shaped like the system files."""
+        organism = {
+            "name": self.string(self.organism_names[idx]),
+            "biomes": self.organism_biomes(idx),
+            "resources": {res: True for res in self.mask_resources(self.organism_mask(idx))},
+        }
+        if self.organism_kinds[idx] == FAUNA:
+            organism["temperament"] = self.string(self.organism_temperaments[idx])
+        if self.organism_outposts[idx] != OUTPOST_UNKNOWN:
+            organism["outpost"] = bool(self.organism_outposts[idx])
+        return organism
+
+    def planet(self, row):
+        """Return one planet as a dictionary shaped like the old per-file records."""
+        planet = {
+            "name": self.string(self.names[row]),
+            "system": self.string(self.systems[row]),
+            "gravity": self.gravity[row],
+        }
+        for key, column in self.string_columns.items():
+            planet[key] = self.string(column[row])
+        planet["traits"] = self.traits(row)
+        planet["resources"] = {res: True for res in self.mask_resources(self.mask(row))}
+        planet["fauna"] = []
+        planet["flora"] = []
+        for idx in self.organism_range(row):
+            planet["fauna" if self.organism_kinds[idx] == FAUNA else "flora"].append(self.organism(idx))
+        return planet
+
+    def organism_columns(self, start=0, stop=None, first_row=None):
+        """Return OrganismColumns for the organisms of rows start..stop, for indexing.
+
+        Rows are numbered from first_row instead of start when given, e.g. for rows
+        a reload moves to new ids.
+        """
+        stop = len(self) if stop is None else stop
+        shift = 0 if first_row is None else first_row - start
+        first, end = self._organism_offsets[start], self._organism_offsets[stop]
+        rows = []
+        for row in range(start, stop):
+            rows += [row + shift] * len(self.organism_range(row))
+        kinds = self.organism_kinds[first:end].tolist()
+        return OrganismColumns(
+            self, first, rows, kinds,
+            [None if outpost == OUTPOST_UNKNOWN else bool(outpost) for outpost in self.organism_outposts[first:end]],
+            [self.organism_mask(idx) for idx in range(first, end)],
+            [tuple(self.organism_biomes(idx)) for idx in range(first, end)],
+            [self.string(self.organism_temperaments[idx]) if kind == FAUNA else ""
+             for idx, kind in zip(range(first, end), kinds)])
+
+    def records(self):
+        """Return every planet as a dictionary, in catalog row order."""
+        return [self.planet(row) for row in range(len(self))]
+
+    def summary_columns(self, start=0, stop=None):
+        """Return the top-level planet attributes as {column: list}, without organisms."""
+        stop = len(self) if stop is None else stop
+        columns = {
+            "name": [self.string(sid) for sid in self.names[start:stop]],
+            "system": [self.string(sid) for sid in self.systems[start:stop]],
+            "gravity": self.gravity[start:stop].tolist(),
+        }
+        for key, column in self.string_columns.items():
+            columns[key] = [self.string(sid) for sid in column[start:stop]]
+        return columns
+
+
+class CatalogBuilder(PlanetColumns):
+    """Accumulate parsed source files into catalog columns, one file at a time.
+
+    Resources missing from the Resources catalogs get bits after the organic ones,
+    in the order they are first seen, so row ids and bits handed out while files are
+    still being added stay valid in the written catalog. Passing the resource_names
+    of an open session keeps the bits of a partial rebuild in line with it.
+    """
+
+    def __init__(self, inorganic, organic, resource_names=None):
+        self.inorganic_count = len(inorganic)
+        self.organic_count = len(organic)
+        self.resource_names = list(resource_names or list(inorganic) + list(organic))
+        self._resource_bits = {name.lower(): bit for bit, name in enumerate(self.resource_names)}
+        self._strings = {}
+        self._string_list = []
+
+        self._sources = []
+        self.names, self.systems, self.source_ids = array('I'), array('I'), array('I')
+        self.string_columns = {key: array('I') for _, key in PLANET_STRING_COLUMNS}
+        self.gravity = array('d')
+        self.masks = []
+        self._trait_offsets, self._traits = array('I', [0]), array('I')
+        self._organism_offsets = array('I', [0])
+        self.organism_kinds, self.organism_names = array('B'), array('I')
+        self.organism_temperaments, self.organism_outposts = array('I'), array('b')
+        self.organism_masks = []
+        self._biome_offsets, self._biomes = array('I', [0]), array('I')
+        self.manifest = []
+        self._manifest_organisms = []  # first organism id of each manifest entry
+        self.errors = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getstate__(self):
+        # Worker processes send builders back to the parent; the lookup dicts are
+        # rebuilt from the lists rather than pickled twice.
+        state = self.__dict__.copy()
+        del state['_strings'], state['_resource_bits']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._strings = {value: sid for sid, value in enumerate(self._string_list)}
+        self._resource_bits = {name.lower(): bit for bit, name in enumerate(self.resource_names)}
+
+    def intern(self, value):
+        value = "" if value is None else str(value)
+        sid = self._strings.get(value)
+        if sid is None:
+            sid = self._strings[value] = len(self._string_list)
+            self._string_list.append(value)
+        return sid
+
+    def resource_bit(self, name):
+        """Return the bit of a resource, giving unknown names the next free bit."""
+        bit = self._resource_bits.get(name.lower())
+        if bit is None:
+            bit = self._resource_bits[name.lower()] = len(self.resource_names)
+            self.resource_names.append(name)
+        return bit
+
+    def resource_mask(self, resources):
+        """Bitmask of the available resources in a name -> bool dictionary."""
+        mask = 0
+        for res, available in resources.items():
+            if available:
+                mask |= 1 << self.resource_bit(res)
+        return mask
+
+    def add_source(self, path, stat, digest, planets, error=None):
+        """Append one parsed source file and return the range of row ids it was given.
+
+        planets may be any iterable of (system name, planet) pairs, and digest and
+        error callables that are only asked once the planets have all been read.
+        """
+        source_id = len(self._sources)
+        first_row = len(self.names)
+        self._sources.append(None)  # stamped below, once the planet count and digest are known
+        for system_name, planet in planets:
+            # Consecutive planets of one system in one file form a manifest entry.
+            if len(self.names) == first_row or self.systems[-1] != self.intern(system_name):
+                self.manifest.append([self.intern(system_name), source_id, len(self.names), 0,
+                                      len(self.organism_kinds), 0])
+                self._manifest_organisms.append(len(self.organism_kinds))
+            self.names.append(self.intern(planet.get('name')))
+            self.systems.append(self.intern(system_name))
+            self.source_ids.append(source_id)
+            for key, column in self.string_columns.items():
+                column.append(self.intern(planet.get(key)))
+            try:
+                self.gravity.append(float(planet.get('gravity')))
+            except (TypeError, ValueError):
+                self.gravity.append(float('nan'))
+
+            # Fauna and flora resources count as planet resources, as they always have.
+            mask = self.resource_mask(planet.get('resources', {}))
+            for kind, key in ((FAUNA, 'fauna'), (FLORA, 'flora')):
+                for organism in planet.get(key, []):
+                    organism_mask = self.resource_mask(organism.get('resources', {}))
+                    mask |= organism_mask
+                    self.organism_kinds.append(kind)
+                    self.organism_names.append(self.intern(organism.get('name')))
+                    self.organism_temperaments.append(self.intern(organism.get('temperament')))
+                    outpost = organism.get('outpost')
+                    self.organism_outposts.append(OUTPOST_UNKNOWN if outpost is None else int(bool(outpost)))
+                    self.organism_masks.append(organism_mask)
+                    self._biomes.extend(self.intern(biome) for biome in organism.get('biomes', []))
+                    self._biome_offsets.append(len(self._biomes))
+            self.masks.append(mask)
+
+            self._traits.extend(self.intern(trait) for trait in planet.get('traits', []))
+            self._trait_offsets.append(len(self._traits))
+            self._organism_offsets.append(len(self.organism_kinds))
+            entry = self.manifest[-1]
+            entry[3] = len(self.names) - entry[2]
+            entry[5] = len(self.organism_kinds) - entry[4]
+        if callable(digest):
+            digest = digest()
+        if callable(error):
+            error = error()
+        if error is not None:
+            self.errors.append((path, error))
+        self._sources[source_id] = (self.intern(path), first_row, len(self.names) - first_row,
+                                    stat.st_mtime_ns, stat.st_size, digest)
+        return range(first_row, len(self.names))
+
+    def extend(self, other):
+        """Append everything another builder collected and return the row range it got.
+
+        String ids, resource bits, sources and organism offsets of other are remapped
+        into this builder, as if its files had been added here one by one.
+        """
+        strings = array('I', [self.intern(value) for value in other._string_list])
+        bits = [self.resource_bit(name) for name in other.resource_names]
+        if bits == list(range(len(bits))):
+            remap_mask = lambda mask: mask
+        else:
+            remap_mask = lambda mask: sum(1 << bits[bit] for bit in iter_bits(mask))
+        first_row, first_organism = len(self.names), len(self.organism_kinds)
+        first_source, first_trait, first_biome = len(self._sources), len(self._traits), len(self._biomes)
+
+        for path_sid, start, count, mtime_ns, size, digest in other._sources:
+            self._sources.append((strings[path_sid], start + first_row, count, mtime_ns, size, digest))
+        self.names.extend(strings[sid] for sid in other.names)
+        self.systems.extend(strings[sid] for sid in other.systems)
+        self.source_ids.extend(source_id + first_source for source_id in other.source_ids)
+        for key, column in self.string_columns.items():
+            column.extend(strings[sid] for sid in other.string_columns[key])
+        self.gravity.extend(other.gravity)
+        self.masks.extend(remap_mask(mask) for mask in other.masks)
+        self._traits.extend(strings[sid] for sid in other._traits)
+        self._trait_offsets.extend(offset + first_trait for offset in other._trait_offsets[1:])
+        self._organism_offsets.extend(offset + first_organism for offset in other._organism_offsets[1:])
+
+        self.organism_kinds.extend(other.organism_kinds)
+        self.organism_names.extend(strings[sid] for sid in other.organism_names)
+        self.organism_temperaments.extend(strings[sid] for sid in other.organism_temperaments)
+        self.organism_outposts.extend(other.organism_outposts)
+        self.organism_masks.extend(remap_mask(mask) for mask in other.organism_masks)
+        self._biomes.extend(strings[sid] for sid in other._biomes)
+        self._biome_offsets.extend(offset + first_biome for offset in other._biome_offsets[1:])
+        # Entries go in last, once the organisms they point at are all there
+        for name_sid, source_id, start, count, organism_start, organism_count in other.manifest:
+            self.manifest.append([strings[name_sid], source_id + first_source, start + first_row, count,
+                                  organism_start + first_organism, organism_count])
+            self._manifest_organisms.append(organism_start + first_organism)
+        self.errors.extend(other.errors)
+        return range(first_row, len(self.names))
+
+    def source_digest(self, source_id):
+        return self._sources[source_id][5]
+
+    def restamp_source(self, source_id, path, stat):
+        """Point a source at the file it was just read from, e.g. after a cache hit."""
+        old_path_sid, first_row, count, _, _, digest = self._sources[source_id]
+        old_path = self._string_list[old_path_sid]
+        self._sources[source_id] = (self.intern(path), first_row, count, stat.st_mtime_ns, stat.st_size, digest)
+        self.errors = [(path if error_path == old_path else error_path, message)
+                       for error_path, message in self.errors]
+
+    def string(self, sid):
+        return self._string_list[sid]
+
+    def mask(self, row):
+        return self.masks[row]
+
+    def organism_mask(self, idx):
+        return self.organism_masks[idx]
+
+    def write(self, catalog_path):
+        """Lay out the string table and columns and write the catalog atomically."""
+        resource_sids = array('I', [self.intern(name) for name in self.resource_names])
+        mask_bytes = _mask_bytes(len(self.resource_names))
+        string_data = bytearray()
+        string_offsets = array('I', [0])
+        for value in self._string_list:
+            string_data += value.encode('utf-8')
+            string_offsets.append(len(string_data))
+
+        sections = [
+            (b"SOFF", string_offsets.tobytes()),
+            (b"SDAT", bytes(string_data)),
+            (b"SRCS", b"".join(SOURCE.pack(*source) for source in self._sources)),
+            (b"SYST", b"".join(SYSTEM.pack(*entry) for entry in self.manifest)),
+            (b"RINF", array('I', [self.inorganic_count, self.organic_count, mask_bytes]).tobytes()),
+            (b"RNAM", resource_sids.tobytes()),
+            (b"PNAM", self.names.tobytes()),
+            (b"PSYS", self.systems.tobytes()),
+            (b"PSRC", self.source_ids.tobytes()),
+            (b"PGRV", self.gravity.tobytes()),
+            (b"PMSK", b"".join(mask.to_bytes(mask_bytes, 'little') for mask in self.masks)),
+            (b"PTRO", self._trait_offsets.tobytes()),
+            (b"PTRT", self._traits.tobytes()),
+            (b"PORG", self._organism_offsets.tobytes()),
+            (b"OKND", self.organism_kinds.tobytes()),
+            (b"ONAM", self.organism_names.tobytes()),
+            (b"OTMP", self.organism_temperaments.tobytes()),
+            (b"OOUT", self.organism_outposts.tobytes()),
+            (b"OMSK", b"".join(mask.to_bytes(mask_bytes, 'little') for mask in self.organism_masks)),
+            (b"OBIO", self._biome_offsets.tobytes()),
+            (b"OBIS", self._biomes.tobytes()),
+        ]
+        sections += [(tag, self.string_columns[key].tobytes()) for tag, key in PLANET_STRING_COLUMNS]
+        _write_catalog(catalog_path, sections)
+
+
+def compile_catalog(systems_directory=SYSTEMS_DIRECTORY, resources_directory=RESOURCES_DIRECTORY,
+                    catalog_path=CATALOG_PATH, workers=None, processes=None, errors=None,
+                    cache_directory=CACHE_DIRECTORY):
+    """Compile Systems/*.json and the resource catalogs into one binary catalog file.
+
+    Files that could not be parsed are appended to errors as (path, message).
+    """
+    builder = CatalogBuilder(*load_resource_catalogs(resources_directory))
+    paths = source_paths(systems_directory, resources_directory)
+    for _ in ingest_sources(builder, paths, systems_directory, workers, processes, cache_directory=cache_directory):
+        pass
+    builder.write(catalog_path)
+    if errors is not None:
+        errors.extend(builder.errors)
+    return len(builder)
+
+
+def _write_catalog(catalog_path, sections):
+    """Write sections to catalog_path atomically, each aligned to 8 bytes.
+
+    Raises CatalogError if the old catalog cannot be replaced, as on Windows while
+    another viewer has it memory-mapped; the old file is left as it was.
+    """
+    offset = _align(HEADER.size + SECTION.size * len(sections))
+    table = []
+    for tag, payload in sections:
+        table.append((tag, offset, len(payload)))
+        offset = _align(offset + len(payload))
+
+    directory = os.path.dirname(os.path.abspath(catalog_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".catalog-", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(CATALOG_MAGIC, CATALOG_VERSION, BYTEORDER, len(sections)))
+            for entry in table:
+                f.write(SECTION.pack(*entry))
+            for (tag, section_offset, length), (_, payload) in zip(table, sections):
+                f.write(b"\0" * (section_offset - f.tell()))
+                f.write(payload)
+        try:
+            os.replace(tmp_path, catalog_path)
+        except PermissionError as e:
+            raise CatalogError(f"Could not replace {catalog_path}: {e.strerror}. Close any other Starfieldpedia "
+                               "window using it and start again to save the rebuilt catalog.") from e
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class Catalog(PlanetColumns):
+    """Read-only, memory-mapped view of a compiled planet catalog."""
+
+    def __init__(self, catalog_path=CATALOG_PATH):
+        self.path = catalog_path
+        with open(catalog_path, 'rb') as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:  # empty file
+                raise CatalogError(str(e))
+        self._view = memoryview(self._mmap)
+        try:
+            magic, version, byteorder, count = HEADER.unpack_from(self._view)
+            if (magic, version, byteorder) != (CATALOG_MAGIC, CATALOG_VERSION, BYTEORDER):
+                raise CatalogError(f"{catalog_path} was written by another catalog version")
+            self._sections = {}
+            for idx in range(count):
+                tag, offset, length = SECTION.unpack_from(self._view, HEADER.size + idx * SECTION.size)
+                if offset + length > len(self._view):
+                    raise CatalogError(f"{catalog_path} is truncated")
+                self._sections[tag] = (offset, length)
+        except (struct.error, CatalogError):
+            self.close()
+            raise CatalogError(f"{catalog_path} is not a valid catalog")
+
+        self._string_offsets = self._column(b"SOFF", 'I')
+        self._string_data = self._column(b"SDAT", 'B')
+        self._strings = [None] * (len(self._string_offsets) - 1)
+
+        self.inorganic_count, self.organic_count, self.mask_bytes = self._column(b"RINF", 'I')
+        self.resource_names = [self.string(sid) for sid in self._column(b"RNAM", 'I')]
+
+        self.names = self._column(b"PNAM", 'I')
+        self.systems = self._column(b"PSYS", 'I')
+        self.sources = self._column(b"PSRC", 'I')
+        self.gravity = self._column(b"PGRV", 'd')
+        self.string_columns = {key: self._column(tag, 'I') for tag, key in PLANET_STRING_COLUMNS}
+        self.masks = self._column(b"PMSK", 'B')
+        self._trait_offsets = self._column(b"PTRO", 'I')
+        self._traits = self._column(b"PTRT", 'I')
+        self._organism_offsets = self._column(b"PORG", 'I')
+        self.organism_kinds = self._column(b"OKND", 'B')
+        self.organism_names = self._column(b"ONAM", 'I')
+        self.organism_temperaments = self._column(b"OTMP", 'I')
+        self.organism_outposts = self._column(b"OOUT", 'b')
+        self.organism_masks = self._column(b"OMSK", 'B')
+        self._biome_offsets = self._column(b"OBIO", 'I')
+        self._biomes = self._column(b"OBIS", 'I')
+
+        self.manifest = [SystemEntry(self.string(name_sid), *fields)
+                         for name_sid, *fields in SYSTEM.iter_unpack(self._column(b"SYST", 'B'))]
+        self._manifest_organisms = [entry.first_organism for entry in self.manifest]
+
+    def _column(self, tag, fmt):
+        if tag not in self._sections:
+            raise CatalogError(f"{self.path} has no {tag.decode()} section")
+        offset, length = self._sections[tag]
+        return self._view[offset:offset + length].cast(fmt)
+
+    def close(self):
+        """Release the memory map; the catalog must not be used afterwards."""
+        # Every exported memoryview has to be released before the mmap can close.
+        for name, value in list(vars(self).items()):
+            if isinstance(value, memoryview):
+                value.release()
+            elif isinstance(value, dict):
+                for column in value.values():
+                    if isinstance(column, memoryview):
+                        column.release()
+        self._view.release()
+        self._mmap.close()
+
+    def __len__(self):
+        return len(self.names)
+
+    def string(self, sid):
+        """Decode an interned string, caching it for later lookups."""
+        value = self._strings[sid]
+        if value is None:
+            start, end = self._string_offsets[sid], self._string_offsets[sid + 1]
+            value = self._strings[sid] = sys.intern(bytes(self._string_data[start:end]).decode('utf-8'))
+        return value
+
+    def source_stamps(self):
+        """Yield (path, first row, planet count, mtime_ns, size, sha1) per source file."""
+        offset, length = self._sections[b"SRCS"]
+        for pos in range(offset, offset + length, SOURCE.size):
+            path_sid, start, count, mtime_ns, size, digest = SOURCE.unpack_from(self._view, pos)
+            yield self.string(path_sid), start, count, mtime_ns, size, digest
+
+    def is_stale(self, paths):
+        """Check the catalog against its sources, re-stamping files that were only touched."""
+        stamps = list(self.source_stamps())
+        if [stamp[0] for stamp in stamps] != paths:
+            return True
+        touched = []
+        for idx, (path, _, _, mtime_ns, size, digest) in enumerate(stamps):
+            stat = os.stat(path)
+            if (stat.st_mtime_ns, stat.st_size) == (mtime_ns, size):
+                continue
+            if stat.st_size != size or file_digest(path) != digest:
+                return True
+            touched.append((idx, stat.st_mtime_ns))
+        if touched:
+            self._restamp(touched)
+        return False
+
+    def _restamp(self, touched):
+        """Record new mtimes for unchanged files so the next launch skips hashing them."""
+        offset = self._sections[b"SRCS"][0]
+        try:
+            with open(self.path, 'r+b') as f:
+                for idx, mtime_ns in touched:
+                    pos = offset + idx * SOURCE.size
+                    path_sid, start, count, _, size, digest = SOURCE.unpack_from(self._view, pos)
+                    f.seek(pos)
+                    f.write(SOURCE.pack(path_sid, start, count, mtime_ns, size, digest))
+        except OSError:
+            pass  # read-only checkout; we will just hash again next time
+
+    def mask(self, row):
+        """Return the resource bitmask of a planet as an int."""
+        start = row * self.mask_bytes
+        return int.from_bytes(self.masks[start:start + self.mask_bytes], 'little')
+
+    def organism_mask(self, idx):
+        """Return the resource bitmask of an organism as an int."""
+        start = idx * self.mask_bytes
+        return int.from_bytes(self.organism_masks[start:start + self.mask_bytes], 'little')
+
+
+def open_current_catalog(paths, catalog_path=CATALOG_PATH):
+    """Open the compiled catalog if it exists and matches the given source files, else None."""
+    try:
+        catalog = Catalog(catalog_path)
+    except (OSError, CatalogError):
+        return None
+    if catalog.is_stale(paths):
+        catalog.close()
+        return None
+    return catalog
+
+
+def load_catalog(systems_directory=SYSTEMS_DIRECTORY, resources_directory=RESOURCES_DIRECTORY,
+                 catalog_path=CATALOG_PATH):
+    """Open the compiled catalog, recompiling it first if any source file changed."""
+    catalog = open_current_catalog(source_paths(systems_directory, resources_directory), catalog_path)
+    if catalog is not None:
+        return catalog
+    compile_catalog(systems_directory, resources_directory, catalog_path)
+    return Catalog(catalog_path)
+
+
+def load_catalog_batches(systems_directory=SYSTEMS_DIRECTORY, resources_directory=RESOURCES_DIRECTORY,
+                         catalog_path=CATALOG_PATH, workers=None, processes=None, cancel=None,
+                         batch_rows=BATCH_ROWS, cache_directory=CACHE_DIRECTORY):
+    """Open or compile the catalog, yielding PlanetBatch items as planets become available.
+
+    The opened Catalog is yielded exactly once: first if the compiled catalog is
+    current, or last once a stale one has been recompiled. Setting the cancel event
+    stops the generator between files or batches without writing a catalog.
+    """
+    paths = source_paths(systems_directory, resources_directory)
+    catalog = open_current_catalog(paths, catalog_path)
+    if catalog is not None:
+        yield catalog
+        for start in range(0, len(catalog), batch_rows):
+            if cancel is not None and cancel.is_set():
+                return
+            stop = min(start + batch_rows, len(catalog))
+            masks = [catalog.mask(row) for row in range(start, stop)]
+            yield PlanetBatch(start, catalog.summary_columns(start, stop), masks,
+                              catalog.resource_names, stop, len(catalog), [], catalog.organism_columns(start, stop))
+        return
+
+    builder = CatalogBuilder(*load_resource_catalogs(resources_directory))
+    reported = 0
+    for rows, done in ingest_sources(builder, paths, systems_directory, workers, processes, cancel,
+                                     cache_directory):
+        yield PlanetBatch(rows.start, builder.summary_columns(rows.start, rows.stop), builder.masks[rows.start:rows.stop],
+                          list(builder.resource_names), done, len(paths), builder.errors[reported:],
+                          builder.organism_columns(rows.start, rows.stop))
+        reported = len(builder.errors)
+    if cancel is not None and cancel.is_set():
+        return
+    builder.write(catalog_path)
+    yield Catalog(catalog_path)
+
+
+if __name__ == "__main__":
+    errors = []
+    try:
+        count = compile_catalog(errors=errors)
+    except CatalogError as e:
+        sys.exit(str(e))
+    for path, message in errors:
+        print(f"Skipped {path}: {message}")
+    print(f"Compiled {count} planets into {CATALOG_PATH}")
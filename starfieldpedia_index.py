@@ -0,0 +1,300 @@
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, namedtuple
+
+# One organism that yields a resource: the planet row it lives on, its kind (FAUNA or
+# FLORA), temperament ('' for flora), biomes and outpost flag (True, False or None if unknown).
+OrganismSource = namedtuple('OrganismSource', 'row name kind temperament biomes outpost')
+
+# The organisms of a run of planets, as handed to the organism indexes: table is the
+# Catalog or CatalogBuilder they are decoded from later and first the table's id of
+# the first one; the other fields hold one entry per organism. rows are the planet
+# row ids they live on, outposts the outpost flags, masks the yielded resources.
+OrganismColumns = namedtuple('OrganismColumns', 'table first rows kinds outposts masks biomes temperaments')
+
+# Sources that can be farmed from an outpost come first, unknown ones next.
+OUTPOST_ORDER = {True: 0, None: 1, False: 2}
+OUTPOST_FLAGS = (True, None, False)
+
+# Number of systems whose organisms are kept decoded by OrganismCache.
+SYSTEM_CACHE_SIZE = 32
+
+
+def iter_bits(mask):
+    """Yield the positions of the set bits in an int, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class ResourceIndex:
+    """Inverted index from resource name to the sorted row ids of planets that have it.
+
+    Row bitmasks are not copied here; they are read from masks, anything with a
+    mask(row) method such as the PlanetStore or Catalog the rows live in. Removed
+    rows must keep their mask there until remove_rows has dropped them.
+    """
+
+    def __init__(self, resource_names, masks):
+        self.resource_names = list(resource_names)
+        self.masks = masks
+        self._bits = {name: bit for bit, name in enumerate(self.resource_names)}
+        self._rows = {name: array('I') for name in self.resource_names}
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        """Build the index from a compiled catalog's per-planet resource bitmasks."""
+        index = cls(catalog.resource_names, catalog)
+        index.add_rows((row, catalog.mask(row)) for row in range(len(catalog)))
+        return index
+
+    def extend_names(self, resource_names):
+        """Add bits for resources first seen after the index was created."""
+        for name in resource_names[len(self.resource_names):]:
+            self._bits[name] = len(self.resource_names)
+            self.resource_names.append(name)
+            self._rows[name] = array('I')
+
+    def mask(self, row):
+        """Return the resource bitmask of a row."""
+        return self.masks.mask(row)
+
+    def resources(self, row):
+        """Return the names of the resources a row offers, in bit order."""
+        return [self.resource_names[bit] for bit in iter_bits(self.mask(row))]
+
+    def has(self, row, resource_name):
+        """Check whether a row offers a resource."""
+        bit = self._bits.get(resource_name)
+        return bit is not None and bool(self.mask(row) >> bit & 1)
+
+    def lookup(self, resource_name):
+        """Return the sorted row ids of planets offering a resource."""
+        rows = self._rows.get(resource_name)
+        return rows if rows is not None else array('I')
+
+    def add_rows(self, rows):
+        """Index (row id, resource bitmask) pairs; ascending new rows are appended in O(1)."""
+        for row, mask in rows:
+            for bit in iter_bits(mask):
+                bucket = self._rows[self.resource_names[bit]]
+                if not bucket or bucket[-1] < row:
+                    bucket.append(row)
+                else:
+                    insort(bucket, row)
+
+    def remove_rows(self, rows):
+        """Drop row ids from the index, e.g. when their system file changed or vanished."""
+        for row in rows:
+            for bit in iter_bits(self.mask(row)):
+                bucket = self._rows[self.resource_names[bit]]
+                pos = bisect_left(bucket, row)
+                if pos < len(bucket) and bucket[pos] == row:
+                    del bucket[pos]
+
+    def replace_rows(self, old_rows, new_rows):
+        """Swap the rows of one reloaded system file for its new (row id, mask) pairs."""
+        self.remove_rows(old_rows)
+        self.add_rows(new_rows)
+
+
+class PlanetIndex:
+    """Hash indexes from planet name, and from (system, planet name), to row ids.
+
+    Planet names are not unique (Procyon A lists "Procyon IV" twice), so both
+    indexes map to tuples of row ids. Lookups ignore case.
+    """
+
+    def __init__(self):
+        self._by_name = {}
+        self._by_key = {}
+        self._keys = {}
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        """Build the index from a compiled catalog's name and system columns."""
+        index = cls()
+        index.add_rows((row, catalog.string(catalog.systems[row]), catalog.string(catalog.names[row]))
+                       for row in range(len(catalog)))
+        return index
+
+    def rows(self, name, system=None):
+        """Return the row ids of planets called name, optionally only within one system."""
+        if system is None:
+            return self._by_name.get(name.casefold(), ())
+        return self._by_key.get((system.casefold(), name.casefold()), ())
+
+    def row(self, system, name):
+        """Return the first row id of a planet in a system, or None."""
+        rows = self.rows(name, system)
+        return rows[0] if rows else None
+
+    def add_rows(self, rows):
+        """Index (row id, system name, planet name) triples."""
+        for row, system, name in rows:
+            key = (system.casefold(), name.casefold())
+            self._keys[row] = key
+            self._by_name[key[1]] = self._by_name.get(key[1], ()) + (row,)
+            self._by_key[key] = self._by_key.get(key, ()) + (row,)
+
+    def remove_rows(self, rows):
+        """Drop row ids from both indexes."""
+        for row in rows:
+            key = self._keys.pop(row, None)
+            if key is None:
+                continue
+            for index, index_key in ((self._by_name, key[1]), (self._by_key, key)):
+                remaining = tuple(r for r in index[index_key] if r != row)
+                if remaining:
+                    index[index_key] = remaining
+                else:
+                    del index[index_key]
+
+    def replace_rows(self, old_rows, new_rows):
+        """Swap the rows of one reloaded system file for its new (row, system, name) triples."""
+        self.remove_rows(old_rows)
+        self.add_rows(new_rows)
+
+
+class OrganismCache:
+    """Bounded LRU of decoded organism details, filled one system at a time.
+
+    The first organism asked for decodes every organism of its system's manifest
+    entry; a system is dropped again once max_systems others were used more recently.
+    """
+
+    def __init__(self, max_systems=SYSTEM_CACHE_SIZE):
+        self.max_systems = max_systems
+        self._systems = OrderedDict()
+
+    def details(self, table, idx):
+        """Return (name, temperament, biomes) of organism idx of a Catalog or CatalogBuilder."""
+        organisms = table.system_organisms(idx)
+        key = (table, organisms.start)
+        system = self._systems.get(key)
+        if system is None:
+            system = self._systems[key] = [table.organism_details(other) for other in organisms]
+            if len(self._systems) > self.max_systems:
+                self._systems.popitem(last=False)
+        else:
+            self._systems.move_to_end(key)
+        return system[idx - organisms.start]
+
+    def clear(self):
+        self._systems.clear()
+
+
+class OrganismIndex:
+    """Inverted index from resource name to the organisms that yield it, across every planet.
+
+    Organisms are numbered in the order they are added. Only their planet rows, kinds
+    and outpost flags are kept, in arrays, with an ascending array of ids per
+    resource; names, temperaments and biomes stay in the catalog (or reload builder)
+    they were read from and are decoded through an OrganismCache when a source is
+    asked for.
+    """
+
+    def __init__(self, resource_names, cache=None):
+        self.resource_names = list(resource_names)
+        self.cache = OrganismCache() if cache is None else cache
+        self.rows = array('I')  # organism id -> planet row id
+        self.kinds = array('B')
+        self.outposts = array('B')  # OUTPOST_ORDER codes
+        self._ids = {name: array('I') for name in self.resource_names}
+        self._planets = {}  # planet row id -> range of its organism ids
+        self._table_starts = []  # first organism id of each add_organisms call
+        self._tables = []  # [table, its id of that organism, organisms still indexed] per call
+
+    @property
+    def size(self):
+        """Number of organism ids handed out so far, removed ones included."""
+        return len(self.rows)
+
+    def extend_names(self, resource_names):
+        """Add resources first seen after the index was created."""
+        for name in resource_names[len(self.resource_names):]:
+            self.resource_names.append(name)
+            self._ids[name] = array('I')
+
+    def add_organisms(self, organisms):
+        """Index an OrganismColumns run and return the range of organism ids it was given."""
+        ids = range(self.size, self.size + len(organisms.rows))
+        if not ids:
+            return ids
+        self._table_starts.append(ids.start)
+        self._tables.append([organisms.table, organisms.first, len(ids)])
+        self.rows.extend(organisms.rows)
+        self.kinds.extend(organisms.kinds)
+        self.outposts.extend(OUTPOST_ORDER[outpost] for outpost in organisms.outposts)
+        for oid, row, mask in zip(ids, organisms.rows, organisms.masks):
+            planet = self._planets.get(row)
+            self._planets[row] = range(oid if planet is None else planet.start, oid + 1)
+            for bit in iter_bits(mask):
+                self._ids[self.resource_names[bit]].append(oid)
+        return ids
+
+    def remove_rows(self, rows):
+        """Drop the organisms of planet rows, e.g. when their system file changed or vanished.
+
+        Returns the ids of the organisms removed.
+        """
+        removed = []
+        for row in rows:
+            planet = self._planets.pop(row, None)
+            if planet is not None:
+                removed.append(planet)
+        for ids in self._ids.values():
+            for planet in removed:
+                del ids[bisect_left(ids, planet.start):bisect_left(ids, planet.stop)]
+        for planet in removed:
+            # A table nothing refers to any more, such as an old reload's, can be freed
+            table = self._tables[bisect_right(self._table_starts, planet.start) - 1]
+            table[2] -= len(planet)
+            if not table[2]:
+                table[0] = None
+        return [oid for planet in removed for oid in planet]
+
+    def move_to(self, table):
+        """Decode every organism indexed so far from table, e.g. the catalog their builder was written to."""
+        for entry in self._tables:
+            if entry[0] is not None:
+                entry[0] = table
+        self.cache.clear()
+
+    def source(self, oid):
+        """Return one organism as an OrganismSource, decoding its details through the cache."""
+        pos = bisect_right(self._table_starts, oid) - 1
+        table, first, _ = self._tables[pos]
+        name, temperament, biomes = self.cache.details(table, first + oid - self._table_starts[pos])
+        return OrganismSource(self.rows[oid], name, self.kinds[oid], temperament, biomes,
+                              OUTPOST_FLAGS[self.outposts[oid]])
+
+    def sources(self, ids):
+        """Return the OrganismSource entries of organism ids, in the order given."""
+        return [self.source(oid) for oid in ids]
+
+    def ids(self, resource_name):
+        """Return the ascending ids of every organism yielding a resource."""
+        ids = self._ids.get(resource_name)
+        return ids if ids is not None else array('I')
+
+    def lookup(self, resource_name):
+        """Return every organism yielding a resource, in the order they were indexed."""
+        return self.sources(self.ids(resource_name))
+
+    def providers(self, resource_name):
+        """Return (planet row, outpost flag) for every organism yielding a resource, decoding nothing."""
+        return [(self.rows[oid], OUTPOST_FLAGS[self.outposts[oid]]) for oid in self.ids(resource_name)]
+
+    def planet_sources(self, row, resource_name):
+        """Return the organisms of one planet that yield a resource."""
+        planet = self._planets.get(row)
+        if planet is None:
+            return []
+        ids = self.ids(resource_name)
+        return self.sources(ids[bisect_left(ids, planet.start):bisect_left(ids, planet.stop)])
+
+    def farm_sources(self, resource_name):
+        """Return every organism yielding a resource, outpost-farmable ones first."""
+        return self.sources(sorted(self.ids(resource_name), key=lambda oid: (self.outposts[oid], self.rows[oid])))
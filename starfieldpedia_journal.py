@@ -0,0 +1,258 @@
+import os
+import json
+import tempfile
+import threading
+
+JOURNAL_FILE = "starfieldpedia_creator.journal"
+# Records appended before the journal is rewritten as a snapshot of its state
+COMPACT_RECORDS = 5000
+
+# Scalar planet fields and their values on a new tab
+PLANET_FIELDS = {"name": "", "notes": "", "type": None, "gravity": "", "temperature": None,
+                 "atmosphere": None, "magnetosphere": None}
+# Records that overwrite a value; a queued one is replaced by a newer one for the same key
+OVERWRITE_OPS = ("system", "set")
+
+
+def new_planet_state():
+    """Return the state of an empty planet tab.
+
+    traits and resources are ordered dicts used as sets; organisms maps an organism
+    id to the dict OrganismDetailsDialog.get_data returns.
+    """
+    state = dict(PLANET_FIELDS)
+    state.update(traits={}, resources={}, organisms={})
+    return state
+
+
+def planet_records(tab, planet):
+    """Yield the records that fill a newly added tab with a planet state."""
+    for field, default in PLANET_FIELDS.items():
+        if planet[field] != default:
+            yield ["set", tab, field, planet[field]]
+    for trait in planet["traits"]:
+        yield ["trait", tab, trait, True]
+    for resource in planet["resources"]:
+        yield ["res", tab, resource, True]
+    for organism, data in planet["organisms"].items():
+        yield ["org+", tab, organism, data]
+
+
+class JournalState:
+    """The data-entry session a journal describes, folded from its records.
+
+    Records are short JSON lists, one per line:
+
+        ["system", text]                      system name edited
+        ["open", path, tab]                   system file opened; its planets become
+                                              tabs tab, tab + 1, ... in file order
+        ["add", tab] / ["del", tab]           planet tab added or deleted
+        ["set", tab, field, value]            scalar planet field edited
+        ["trait", tab, trait, checked]        trait toggled
+        ["res", tab, resource, checked]       resource toggled
+        ["org+", tab, organism, data]         organism added
+        ["org-", tab, organism]               organism deleted
+        ["snap", n] / ["saved", n]            save n started / finished
+
+    Tabs and organisms are named by ids that stay fixed while others are deleted.
+    """
+
+    def __init__(self):
+        self.system = ""
+        self.opened = None  # [path, first tab id] of the file being edited
+        self.tabs = {}  # tab id -> planet state, in tab order
+        self.edits = 0
+        self.saved_edits = 0
+        self._snaps = {}  # save number -> edits folded when it was snapshotted
+
+    @property
+    def dirty(self):
+        """Whether there are edits no finished save has covered."""
+        return self.edits != self.saved_edits
+
+    def apply(self, record):
+        op = record[0]
+        if op == "snap":
+            self._snaps[record[1]] = self.edits
+            return
+        if op == "saved":
+            if record[1] in self._snaps:
+                self.saved_edits = self._snaps.pop(record[1])
+            return
+        self.edits += 1
+        if op == "system":
+            self.system = record[1]
+        elif op == "open":
+            self.opened = record[1:3]
+        elif op == "add":
+            self.tabs[record[1]] = new_planet_state()
+        elif op == "del":
+            self.tabs.pop(record[1], None)
+        else:
+            planet = self.tabs.get(record[1])
+            if planet is None:
+                return
+            if op == "set":
+                if record[2] in PLANET_FIELDS:
+                    planet[record[2]] = record[3]
+            elif op in ("trait", "res"):
+                chosen = planet["traits" if op == "trait" else "resources"]
+                if record[3]:
+                    chosen[record[2]] = True
+                else:
+                    chosen.pop(record[2], None)
+            elif op == "org+":
+                planet["organisms"][record[2]] = record[3]
+            elif op == "org-":
+                planet["organisms"].pop(record[2], None)
+
+    def records(self):
+        """Yield the fewest records that rebuild this state.
+
+        A save still running keeps its ["snap", n] when it covers every edit, so
+        its ["saved", n] can still mark the rebuilt state clean. One started before
+        later edits is left out; its state is gone, and the rebuilt state stays dirty.
+        """
+        if self.system:
+            yield ["system", self.system]
+        if self.opened:
+            yield ["open"] + self.opened
+        for tab, planet in self.tabs.items():
+            yield ["add", tab]
+            yield from planet_records(tab, planet)
+        if not self.dirty:
+            yield ["snap", 0]
+            yield ["saved", 0]
+        for serial, edits in self._snaps.items():
+            if edits == self.edits:
+                yield ["snap", serial]
+
+
+def read_journal(path=JOURNAL_FILE):
+    """Fold a journal file into a JournalState; a missing file is an empty session.
+
+    The file is parsed as one JSON array, which is several times faster than a
+    json.loads per line. If that fails, lines are read one at a time up to the
+    first that does not parse, such as one cut short by a crash.
+    """
+    state = JournalState()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+    except OSError:
+        return state
+    # Records never contain a raw newline, so the lines join into an array
+    lines = text.rstrip("\n")
+    try:
+        records = json.loads("[" + lines.replace("\n", ",") + "]") if lines else []
+    except json.JSONDecodeError:
+        records = []
+        for line in lines.split("\n"):
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    for record in records:
+        if isinstance(record, list) and record:
+            state.apply(record)
+    state._snaps.clear()
+    return state
+
+
+def encode_record(record):
+    return json.dumps(record, separators=(',', ':')) + "\n"
+
+
+class Journal:
+    """Append-only change journal, written by a background thread.
+
+    record() only queues, so the GUI never waits on the disk. The writer appends
+    each batch of queued records, folds them into its JournalState, and every
+    compact_records records rewrites the file as the snapshot state.records() gives.
+    It starts with such a rewrite, so a replayed journal begins compacted and
+    passing a fresh state starts a new one.
+    """
+
+    def __init__(self, path=JOURNAL_FILE, state=None, compact_records=COMPACT_RECORDS):
+        self.path = path
+        self.state = state if state is not None else JournalState()
+        self.compact_records = compact_records
+        self.error = None
+        self._queue = []
+        self._closing = False
+        self._file = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, *record):
+        """Queue one record; a field edit replaces a still-queued edit of the same field."""
+        if self.error is not None:
+            return
+        record = list(record)
+        with self._condition:
+            if (record[0] in OVERWRITE_OPS and self._queue
+                    and self._queue[-1][:-1] == record[:-1]):
+                self._queue[-1] = record
+            else:
+                self._queue.append(record)
+            self._condition.notify()
+
+    def close(self):
+        """Write what is queued and stop the writer; a journal with nothing unsaved is removed."""
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+        self._thread.join()
+        if self.error is None and not self.state.dirty:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def _run(self):
+        try:
+            self._compact()
+            appended = 0
+            while True:
+                with self._condition:
+                    while not self._queue and not self._closing:
+                        self._condition.wait()
+                    batch, self._queue = self._queue, []
+                    closing = self._closing
+                if batch:
+                    self._file.write("".join(encode_record(record) for record in batch))
+                    self._file.flush()
+                    for record in batch:
+                        self.state.apply(record)
+                    appended += len(batch)
+                    if appended >= self.compact_records:
+                        self._compact()
+                        appended = 0
+                if closing:
+                    break
+        except (OSError, TypeError, ValueError) as e:
+            # Stop journaling; the session itself carries on
+            self.error = e
+        finally:
+            if self._file is not None:
+                self._file.close()
+
+    def _compact(self):
+        """Replace the file with the current state's records: temp file, fsync, rename."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".journal-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write("".join(encode_record(record) for record in self.state.records()))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._file = open(self.path, 'a', encoding='utf-8')
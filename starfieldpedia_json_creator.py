@@ -1,14 +1,21 @@
 import sys
 import os
 import json
-from functools import partial
+import tempfile
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QRect, QSize, Qt, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, 
                              QCheckBox, QPushButton, QDialog, 
                              QLineEdit, QFormLayout, QScrollArea,
                              QGroupBox, QLabel, QRadioButton, 
                              QGridLayout, QHBoxLayout, QButtonGroup, QTabWidget,
                              QTextEdit, QComboBox, QTableWidget, QTableWidgetItem,
-                             QMessageBox)
+                             QMessageBox, QListView, QStyle, QStyledItemDelegate, QStyleOptionButton,
+                             QProgressBar, QFileDialog)
+
+from starfieldpedia_journal import (JOURNAL_FILE, Journal, JournalState, new_planet_state, planet_records,
+                                    read_journal)
+from starfieldpedia_stream import SYSTEMS_KEYS
 
 # Load resources from JSON files
 with open("Resources/inorganic_resources.json", "r") as f:
@@ -33,7 +40,367 @@ def text_color_for_background(hex_color):
         return "#000000"  # Black for bright backgrounds
     else:
         return "#FFFFFF"  # White for dark backgrounds
-    
+
+
+def resource_color(resource):
+    """Return the swatch color of an inorganic resource; invalid colors such as "#FFFFFFF" become white."""
+    color = QColor(inorganic_resources_data.get(resource, {}).get("color", "#FFFFFF"))
+    return color if color.isValid() else QColor("#FFFFFF")
+
+
+# Size of one cell of the resource grid
+RESOURCE_CELL = QSize(130, 28)
+RESOURCE_COLUMNS = 5
+
+
+class ResourceModel(QAbstractListModel):
+    """Every inorganic resource, then every organic one, shared by the resource grid of all tabs.
+
+    Colors are resolved once here; which resources a tab has checked is kept by its
+    ResourceSelector, not in the model.
+    """
+
+    OrganicRole = Qt.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.resources = inorganic_resources + list(organic_resources)
+        self.inorganic_count = len(inorganic_resources)
+        self.colors = [resource_color(resource) for resource in inorganic_resources]
+        self.text_colors = [QColor(text_color_for_background(color.name())) for color in self.colors]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.resources)
+
+    def data(self, index, role=Qt.DisplayRole):
+        row = index.row()
+        if role == Qt.DisplayRole:
+            return self.resources[row]
+        if role == ResourceModel.OrganicRole:
+            return row >= self.inorganic_count
+        if row < self.inorganic_count:
+            if role == Qt.BackgroundRole:
+                return self.colors[row]
+            if role == Qt.ForegroundRole:
+                return self.text_colors[row]
+        return None
+
+
+class ResourceDelegate(QStyledItemDelegate):
+    """Paint resource cells: a colored swatch with a check box for inorganic resources,
+    a push button for organic ones. The check state comes from the view's selection bitset."""
+
+    def paint(self, painter, option, index):
+        view = option.widget
+        style = view.style()
+        rect = option.rect.adjusted(1, 1, -1, -1)
+        if index.data(ResourceModel.OrganicRole):
+            button = QStyleOptionButton()
+            button.rect = rect
+            button.text = index.data()
+            button.state = QStyle.State_Enabled | QStyle.State_Raised
+            if option.state & QStyle.State_MouseOver:
+                button.state |= QStyle.State_MouseOver
+            style.drawControl(QStyle.CE_PushButton, button, painter, view)
+            return
+
+        painter.fillRect(rect, index.data(Qt.BackgroundRole))
+        check = QStyleOptionButton()
+        check.state = QStyle.State_Enabled | (QStyle.State_On if view.isSelected(index.row()) else QStyle.State_Off)
+        indicator = style.subElementRect(QStyle.SE_CheckBoxIndicator, check, view)
+        check.rect = QRect(rect.left() + 4, rect.center().y() - indicator.height() // 2, indicator.width(), indicator.height())
+        style.drawPrimitive(QStyle.PE_IndicatorCheckBox, check, painter, view)
+        painter.save()
+        painter.setPen(index.data(Qt.ForegroundRole))
+        painter.drawText(rect.adjusted(check.rect.width() + 8, 0, 0, 0), Qt.AlignVCenter | Qt.AlignLeft, index.data())
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        return RESOURCE_CELL
+
+
+_resource_model = None
+_resource_delegate = None
+
+def shared_resource_model():
+    """Return the ResourceModel and ResourceDelegate every tab's selector uses, creating them once."""
+    global _resource_model, _resource_delegate
+    if _resource_model is None:
+        _resource_model = ResourceModel(QApplication.instance())
+        _resource_delegate = ResourceDelegate(QApplication.instance())
+    return _resource_model, _resource_delegate
+
+
+class ResourceSelector(QListView):
+    """Grid of every resource for one tab; checked inorganic resources are bits of an int.
+
+    Clicking an inorganic resource toggles its bit; clicking an organic one emits
+    organismRequested with its name.
+    """
+
+    organismRequested = pyqtSignal(str)
+    resourceToggled = pyqtSignal(str, bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        model, delegate = shared_resource_model()
+        self.selection = 0  # bit i set: the model's row i is checked
+        self.setModel(model)
+        self.setItemDelegate(delegate)
+        self.setFlow(QListView.LeftToRight)
+        self.setWrapping(True)
+        self.setResizeMode(QListView.Adjust)
+        self.setUniformItemSizes(True)
+        self.setGridSize(RESOURCE_CELL)
+        self.setSelectionMode(QListView.NoSelection)
+        self.setMouseTracking(True)
+        rows = -(-model.rowCount() // RESOURCE_COLUMNS)
+        self.setMinimumSize(RESOURCE_CELL.width() * RESOURCE_COLUMNS + 4 * self.frameWidth() + 20,
+                            min(rows, 8) * RESOURCE_CELL.height() + 2 * self.frameWidth())
+        self.clicked.connect(self.onClicked)
+
+    def isSelected(self, row):
+        return bool(self.selection >> row & 1)
+
+    def onClicked(self, index):
+        if index.data(ResourceModel.OrganicRole):
+            self.organismRequested.emit(index.data())
+        else:
+            self.selection ^= 1 << index.row()
+            self.viewport().update(self.visualRect(index))
+            self.resourceToggled.emit(index.data(), self.isSelected(index.row()))
+
+    def selectedResources(self):
+        """Return the names of the checked resources, in model order."""
+        resources = self.model().resources
+        return [resources[row] for row in range(len(resources)) if self.selection >> row & 1]
+
+    def setSelectedResources(self, names):
+        """Check exactly the given resources; names not in the model are ignored."""
+        rows = {resource: row for row, resource in enumerate(self.model().resources)}
+        self.selection = 0
+        for name in names:
+            if name in rows:
+                self.selection |= 1 << rows[name]
+        self.viewport().update()
+
+# Opened planets turned into tabs per turn of the event loop
+OPEN_BATCH = 4
+
+# Indentation of one planet inside {"system": [{"planets": [...]}]}
+PLANET_INDENT = " " * 16
+
+
+def write_system_json(f, system_name, planets, progress=None, key="system", document=None):
+    """Stream a system document to f, one planet at a time, as json.dump(..., indent=4) would lay it out.
+
+    progress, if given, is called with the number of planets written so far.
+    document, if given, is the file the system was opened from: only the name and
+    planets of its first system are replaced, and its other keys and systems are
+    written back as they were.
+    """
+    if document is None:
+        document = {key: [{"Name": system_name, "planets": []}]}
+    encoder = json.JSONEncoder(indent=4)
+
+    def dump(value, indent):
+        for chunk in encoder.iterencode(value):
+            f.write(chunk.replace("\n", "\n" + indent))
+
+    f.write('{')
+    for position, (document_key, value) in enumerate(document.items()):
+        f.write((',\n    ' if position else '\n    ') + json.dumps(document_key) + ': ')
+        if document_key != key:
+            dump(value, " " * 4)
+            continue
+        f.write('[\n        {')
+        fields = list(value[0].items())
+        if not any(field.lower() == "name" for field, _ in fields):
+            fields.insert(0, ("Name", None))
+        if not any(field.lower() == "planets" for field, _ in fields):
+            fields.append(("planets", None))
+        for field_position, (field, field_value) in enumerate(fields):
+            f.write((',\n            ' if field_position else '\n            ') + json.dumps(field) + ': ')
+            if field.lower() == "name":
+                f.write(json.dumps(system_name))
+            elif field.lower() == "planets":
+                f.write('[')
+                for count, planet in enumerate(planets, 1):
+                    f.write(",\n" if count > 1 else "\n")
+                    f.write(PLANET_INDENT)
+                    dump(planet, PLANET_INDENT)
+                    if progress is not None:
+                        progress(count)
+                f.write('\n            ]' if planets else ']')
+            else:
+                dump(field_value, " " * 12)
+        f.write('\n        }')
+        for system in value[1:]:
+            f.write(',\n        ')
+            dump(system, " " * 8)
+        f.write('\n    ]')
+    f.write('\n}')
+
+
+def save_system_atomically(filename, system_name, planets, progress=None, key="system", document=None):
+    """Write a system file through a temp file in the same directory, fsync it, then rename it over filename.
+
+    A crash mid-save leaves the previous file untouched.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_path = tempfile.mkstemp(prefix=".save-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            write_system_json(f, system_name, planets, progress, key, document)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class SaveWorker(QThread):
+    """Serialize a snapshot of a system off the GUI thread."""
+    progress = pyqtSignal(int)
+    saved = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, filename, system_name, planets, key="system", document=None, parent=None):
+        super().__init__(parent)
+        self.filename = filename
+        self.system_name = system_name
+        self.planets = planets
+        self.key = key
+        self.document = document
+
+    def run(self):
+        try:
+            save_system_atomically(self.filename, self.system_name, self.planets, self.progress.emit, self.key,
+                                   self.document)
+        except (OSError, TypeError, ValueError) as e:
+            self.failed.emit(f"Could not save {self.filename}: {e}")
+        else:
+            self.saved.emit(self.filename)
+
+
+def chosen_names(value):
+    """Names marked present in a {name: true} mapping, or listed in a plain list."""
+    if isinstance(value, dict):
+        return [name for name, present in value.items() if present]
+    return [name for name in value or () if isinstance(name, str)]
+
+
+def load_system_file(path):
+    """Read a system file as is; returns (document, systems key, system name, planet dicts).
+
+    Only the first system is opened; the whole document and its key ("systems" or
+    "system") are kept so the file can be written back the way it was.
+    """
+    with open(path, 'r') as f:
+        document = json.load(f)
+    keys = [key for key in document if key.lower() in SYSTEMS_KEYS] if isinstance(document, dict) else []
+    if not keys or not isinstance(document[keys[0]], list) or not document[keys[0]]:
+        raise ValueError("No 'systems' list")
+    systems = document[keys[0]]
+    system = {key.lower(): value for key, value in systems[0].items()}
+    return document, keys[0], system.get("name") or "", list(system.get("planets") or [])
+
+
+def planet_state_from_file(planet):
+    """Convert a planet of a system file into a planet state for PlanetTab.setState.
+
+    Organisms keep their file entry under "source", as they cannot be edited, only deleted.
+    """
+    fields = {key.lower(): value for key, value in planet.items()}
+    state = new_planet_state()
+    for field in ("name", "notes", "type", "temperature", "atmosphere", "magnetosphere"):
+        if isinstance(fields.get(field), str):
+            state[field] = fields[field]
+    if fields.get("gravity") is not None:
+        state["gravity"] = str(fields["gravity"])
+    state["traits"] = dict.fromkeys(chosen_names(fields.get("traits")), True)
+    state["resources"] = dict.fromkeys(chosen_names(fields.get("resources")), True)
+    for kind in ("fauna", "flora"):
+        for organism in fields.get(kind) or ():
+            entry = {key.lower(): value for key, value in organism.items()}
+            state["organisms"][len(state["organisms"])] = {
+                'type': kind.capitalize(),
+                'name': entry.get("name", ""),
+                'temperament': entry.get("temperament", ""),
+                'biomes': entry.get("biomes", []),
+                'outpost': entry.get("outpost"),
+                'resource': ", ".join(chosen_names(entry.get("resources"))),
+                'source': organism
+            }
+    return state
+
+
+def gravity_value(text):
+    """Gravity as saved: a number when the text is one, 1.0 when empty, else the text as typed."""
+    if not text:
+        return 1.0
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def merge_planet(original, baseline, planet_data):
+    """Overlay the fields of a planet that changed since it was loaded on its file entry.
+
+    Fields equal to their loaded baseline keep the file's value and keys the creator
+    doesn't edit are kept, so only what was actually edited is re-serialized. An
+    edited field keeps the file's spelling of its key, such as "Notes".
+    """
+    merged = {}
+    for key, value in original.items():
+        field = key.lower()
+        if field in planet_data and planet_data[field] != baseline.get(field):
+            merged[key] = planet_data[field]
+        else:
+            merged[key] = value
+    fields = {key.lower() for key in original}
+    for key, value in planet_data.items():
+        if key not in fields and value != baseline.get(key):
+            merged[key] = value
+    return merged
+
+
+def check_button(group, text):
+    """Check the button of an exclusive group labelled text (ignoring case) and return True,
+    or clear the group and return False if there is none."""
+    for button in group.buttons():
+        if text is not None and button.text().casefold() == text.casefold():
+            button.setChecked(True)
+            return True
+    group.setExclusive(False)
+    for button in group.buttons():
+        button.setChecked(False)
+    group.setExclusive(True)
+    return False
+
+
+class LoadWorker(QThread):
+    """Read a system file off the GUI thread."""
+    loaded = pyqtSignal(str, object, str, str, list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, filename, parent=None):
+        super().__init__(parent)
+        self.filename = filename
+
+    def run(self):
+        try:
+            document, key, system_name, planets = load_system_file(self.filename)
+            planets = [(planet, planet_state_from_file(planet)) for planet in planets]
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            self.failed.emit(f"Could not open {self.filename}: {e}")
+        else:
+            self.loaded.emit(self.filename, document, key, system_name, planets)
+
+
 class OrganismDetailsDialog(QDialog):
     def __init__(self, resource=None, parent=None):
         super().__init__(parent)
@@ -181,9 +548,12 @@ class PlanetTab(QWidget):
         "Slushy Subsurface Seas","Solar Storm Seasons","Sonorous Lithosphere"
         ]
         
-    def __init__(self, planet_tabs, parent=None):
+    def __init__(self, planet_tabs, parent=None, journal=None, tab_id=0):
         super().__init__(parent)
         self.planet_tabs = planet_tabs  # Store the QTabWidget reference
+        self.journal = journal
+        self.tab_id = tab_id  # names this tab in the journal
+        self.applying = False  # set while setState fills widgets, so nothing is journaled
         
         
 
@@ -298,16 +668,88 @@ class PlanetTab(QWidget):
         self.layout.addLayout(temp_layout)
         #####################################
         
+        # Traits, resources and the organism table are built the first time the tab is shown;
+        # until then their values wait in the pending lists
+        self.sections_built = False
+        self.checkboxes = []
+        self.resource_selector = None
+        self.organism_details_table = None
+        self.pending_traits = []
+        self.pending_resources = []
+        self.organisms = {}  # organism id -> OrganismDetailsDialog.get_data(), in table order
+        self.next_organism_id = 0
+        self.unlisted = {}  # field -> loaded value no radio button matches, kept until another is picked
+        # For a planet opened from a file: its entry there, and get_data() as it was loaded
+        self.original = None
+        self.baseline = None
+
+        # Journal every edit
+        self.system_name_le.textChanged.connect(lambda text: self.record("set", "name", text))
+        self.notes_te.textChanged.connect(lambda: self.record("set", "notes", self.notes_te.toPlainText()))
+        self.gravity_te.textChanged.connect(lambda text: self.record("set", "gravity", text))
+        for field, group in self.radioGroups():
+            group.buttonToggled.connect(
+                lambda button, checked, field=field: checked and self.onRadioChecked(field, button))
+
+    def radioGroups(self):
+        return (("type", self.type_group), ("temperature", self.temperature_group),
+                ("atmosphere", self.atmosphere_group), ("magnetosphere", self.magnetosphere_group))
+
+    def onRadioChecked(self, field, button):
+        if not self.applying:
+            self.unlisted.pop(field, None)
+        self.record("set", field, button.text())
+
+    def record(self, op, *args):
+        """Journal an edit of this tab."""
+        if self.journal is not None and not self.applying:
+            self.journal.record(op, self.tab_id, *args)
+
+    def setState(self, state):
+        """Fill the tab from a planet state (see starfieldpedia_journal.new_planet_state) without journaling it."""
+        self.applying = True
+        try:
+            self.system_name_le.setText(state["name"])
+            self.notes_te.setPlainText(state["notes"])
+            self.gravity_te.setText(state["gravity"])
+            self.unlisted = {}
+            for field, group in self.radioGroups():
+                if not check_button(group, state[field]) and state[field] is not None:
+                    self.unlisted[field] = state[field]
+            self.pending_traits = list(state["traits"])
+            self.pending_resources = list(state["resources"])
+            self.organisms = dict(state["organisms"])
+            self.next_organism_id = max(self.organisms, default=-1) + 1
+            if self.sections_built:
+                for checkbox in self.checkboxes:
+                    checkbox.setChecked(checkbox.text() in state["traits"])
+                self.resource_selector.setSelectedResources(self.pending_resources)
+                self.organism_details_table.setRowCount(0)
+                for organism_id, organism_data in self.organisms.items():
+                    self.appendOrganismDetails(organism_id, organism_data)
+        finally:
+            self.applying = False
+
+    def showEvent(self, event):
+        if not self.sections_built:
+            self.buildSections()
+        super().showEvent(event)
+
+    def buildSections(self):
+        """Create the traits, resource grid and organism table sections."""
+        self.sections_built = True
+
         # Add the traits checkboxes
         self.traits_label = QLabel("Planet Traits:", self)
         self.layout.addWidget(self.traits_label)
 
         self.traits_groupbox = QGroupBox("Select Traits", self)
         self.traits_layout = QGridLayout()
-        self.checkboxes = []
 
         for idx, trait in enumerate(PlanetTab.TRAITS):
             checkbox = QCheckBox(trait, self)
+            checkbox.setChecked(trait in self.pending_traits)
+            checkbox.toggled.connect(lambda checked, trait=trait: self.record("trait", trait, checked))
             self.traits_layout.addWidget(checkbox, idx // 5, idx % 5)  # 5 columns
             self.checkboxes.append(checkbox)
 
@@ -316,75 +758,85 @@ class PlanetTab(QWidget):
         
         # End Traits #
 
-        # Resources grid layout to hold both inorganic and organic resources
-        resources_layout = QGridLayout()
-        
-        for idx, resource in enumerate(organic_resources, start=len(inorganic_resources)):
-            btn = QPushButton(resource)
-            btn.setFixedWidth(120)
-            btn.clicked.connect(partial(self.addOrganismDetails, resource_name=resource))
-            resources_layout.addWidget(btn, idx // 5, idx % 5)
-
-
-        # Inorganic Resources - Add checkboxes for inorganic resources
-        for idx, resource in enumerate(inorganic_resources):
-            chk = QCheckBox(resource)
-            resource_color = inorganic_resources_data[resource]["color"]
-            text_color = text_color_for_background(resource_color)
-            chk.setStyleSheet(f"QCheckBox {{ background-color: {resource_color}; color: {text_color}; }}")
-            resources_layout.addWidget(chk, idx // 5, idx % 5)  # 5 columns
-
-        self.layout.addLayout(resources_layout)
+        # Resources grid: one view over the shared resource model; organic resources open the organism dialog
+        self.resource_selector = ResourceSelector(self)
+        self.resource_selector.setSelectedResources(self.pending_resources)
+        self.resource_selector.organismRequested.connect(self.addOrganismDetails)
+        self.resource_selector.resourceToggled.connect(lambda name, checked: self.record("res", name, checked))
+        self.layout.addWidget(self.resource_selector)
 
         # Organism Details Table
         self.organism_details_table = QTableWidget(0, 7, self)
         self.organism_details_table.setHorizontalHeaderLabels(['Resource', 'Type', 'Name', 'Temperament', 'Biomes', 'Outpost', 'Actions'])
         self.layout.addWidget(self.organism_details_table)
-
-        # Create and configure the dialog to enter organism details
-        self.organism_dialog = self.createOrganismDetailsDialog()
+        for organism_id, organism_data in self.organisms.items():
+            self.appendOrganismDetails(organism_id, organism_data)
         
     def get_selected_traits(self):
         """
         Return a list of selected traits.
         """
-        return [cb.text() for cb in self.checkboxes if cb.isChecked()]
+        # Listed traits in checkbox order, then any loaded ones there is no checkbox for
+        if self.sections_built:
+            chosen = {cb.text() for cb in self.checkboxes if cb.isChecked()}
+        else:
+            chosen = set(self.pending_traits)
+        return ([trait for trait in PlanetTab.TRAITS if trait in chosen]
+                + [trait for trait in self.pending_traits if trait not in PlanetTab.TRAITS])
+
+    def get_selected_resources(self):
+        """Return the selected resources in grid order, then any loaded ones the grid doesn't list."""
+        resources = shared_resource_model()[0].resources
+        if self.sections_built:
+            chosen = set(self.resource_selector.selectedResources())
+        else:
+            chosen = set(self.pending_resources)
+        listed = set(resources)
+        return ([resource for resource in resources if resource in chosen]
+                + [resource for resource in self.pending_resources if resource not in listed])
         
-    def appendOrganismDetails(self, organism_data):
+    def appendOrganismDetails(self, organism_id, organism_data):
         """Function to display the added organism details in the table"""
         row_position = self.organism_details_table.rowCount()
         self.organism_details_table.insertRow(row_position)
     
-        self.organism_details_table.setItem(row_position, 0, QTableWidgetItem(organism_data['resource']))
+        resource_item = QTableWidgetItem(organism_data['resource'])
+        resource_item.setData(Qt.UserRole, organism_id)
+        self.organism_details_table.setItem(row_position, 0, resource_item)
         self.organism_details_table.setItem(row_position, 1, QTableWidgetItem(organism_data['type']))
         self.organism_details_table.setItem(row_position, 2, QTableWidgetItem(organism_data['name']))
         temperament_text = organism_data['temperament']
         self.organism_details_table.setItem(row_position, 3, QTableWidgetItem(temperament_text))
         biomes_text = ', '.join(organism_data['biomes'])  # convert list to string
         self.organism_details_table.setItem(row_position, 4, QTableWidgetItem(biomes_text))
-        outpost_text = 'Yes' if organism_data['outpost'] else 'No'
+        outpost_text = 'Unknown' if organism_data['outpost'] is None else 'Yes' if organism_data['outpost'] else 'No'
         self.organism_details_table.setItem(row_position, 5, QTableWidgetItem(outpost_text))
 
         # Add a delete button in the last column
         delete_btn = QPushButton("Delete")
-        delete_btn.clicked.connect(lambda: self.deleteOrganism(row_position))
+        delete_btn.clicked.connect(lambda: self.deleteOrganism(organism_id))
         self.organism_details_table.setCellWidget(row_position, 6, delete_btn)
         
-    def deleteOrganism(self, row):
+    def deleteOrganism(self, organism_id):
         """Function to remove an organism from the table"""
-        self.organism_details_table.removeRow(row)
-        
-    def createOrganismDetailsDialog(self):
-        """Function to create and configure a dialog to enter organism details"""
-        return OrganismDetailsDialog()  # No need to set the resource here.
-
+        # Rows shift as others are deleted, so find this organism's current row
+        for row in range(self.organism_details_table.rowCount()):
+            if self.organism_details_table.item(row, 0).data(Qt.UserRole) == organism_id:
+                self.organism_details_table.removeRow(row)
+                break
+        del self.organisms[organism_id]
+        self.record("org-", organism_id)
         
     def addOrganismDetails(self, resource_name):
         """Function to show the dialog and get the organism details from the user"""
         dialog = OrganismDetailsDialog(resource=resource_name, parent=self)
         if dialog.exec_() == QDialog.Accepted:
             organism_data = dialog.get_data()
-            self.appendOrganismDetails(organism_data)
+            organism_id = self.next_organism_id
+            self.next_organism_id += 1
+            self.organisms[organism_id] = organism_data
+            self.record("org+", organism_id, organism_data)
+            self.appendOrganismDetails(organism_id, organism_data)
 
             
     def deletePlanet(self):
@@ -392,43 +844,72 @@ class PlanetTab(QWidget):
         index = self.planet_tabs.indexOf(self)
         if index != -1:
             self.planet_tabs.removeTab(index)
+            self.record("del")
             
     def get_data(self):
         """Collect data from the PlanetTab's widgets and return as a dictionary."""
         planet_data = {
             "name": self.system_name_le.text(),
-            "type": self.type_group.checkedButton().text() if self.type_group.checkedButton() else "None",
-            "gravity": float(self.gravity_te.text()) if self.gravity_te.text() else 1.0,
-            "temperature": self.temperature_group.checkedButton().text() if self.temperature_group.checkedButton() else "None",
-            "atmosphere": self.atmosphere_group.checkedButton().text() if self.atmosphere_group.checkedButton() else "NONE",
-            "magnetosphere": self.magnetosphere_group.checkedButton().text() if self.magnetosphere_group.checkedButton() else "NONE",
+            "notes": self.notes_te.toPlainText(),
+            "type": self.type_group.checkedButton().text() if self.type_group.checkedButton() else self.unlisted.get("type", "None"),
+            "gravity": gravity_value(self.gravity_te.text()),
+            "temperature": self.temperature_group.checkedButton().text() if self.temperature_group.checkedButton() else self.unlisted.get("temperature", "None"),
+            "atmosphere": self.atmosphere_group.checkedButton().text() if self.atmosphere_group.checkedButton() else self.unlisted.get("atmosphere", "NONE"),
+            "magnetosphere": self.magnetosphere_group.checkedButton().text() if self.magnetosphere_group.checkedButton() else self.unlisted.get("magnetosphere", "NONE"),
             "traits": self.get_selected_traits(),
-            "resources": {resource: chk.isChecked() for resource, chk in zip(inorganic_resources, self.checkboxes) if chk.isChecked()},
+            "resources": {resource: True for resource in self.get_selected_resources()},
             "fauna": [],
             "flora": []
         }
 
-        for row in range(self.organism_details_table.rowCount()):
-            organism_data = {
-                "name": self.organism_details_table.item(row, 2).text(),
-                "Temperament": self.organism_details_table.item(row, 3).text(),
-                "biomes": self.organism_details_table.item(row, 4).text().split(', '),
-                "outpost": self.organism_details_table.item(row, 5).text() == "Yes",
-                "resources": {
-                    self.organism_details_table.item(row, 0).text(): True
+        for organism_data in self.organisms.values():
+            if 'source' in organism_data:
+                # Opened from a file; written back unchanged
+                organism_entry = organism_data['source']
+            else:
+                organism_entry = {
+                    "name": organism_data['name'],
+                    "Temperament": organism_data['temperament'],
+                    "biomes": list(organism_data['biomes']),
+                    "outpost": organism_data['outpost'],
+                    "resources": {
+                        organism_data['resource']: True
+                    }
                 }
-            }
 
-            if self.organism_details_table.item(row, 1).text() == "Fauna":
-                planet_data["fauna"].append(organism_data)
+            if organism_data['type'] == "Fauna":
+                planet_data["fauna"].append(organism_entry)
             else:
-                planet_data["flora"].append(organism_data)
+                planet_data["flora"].append(organism_entry)
 
         return planet_data
+
+    def get_file_data(self):
+        """Return the planet as it should be saved.
+
+        A planet opened from a file is written back exactly as it was read unless it
+        changed; if it did, only its edited fields replace those of the original entry.
+        A new planet only gets notes if some were entered.
+        """
+        planet_data = self.get_data()
+        if self.original is None:
+            if not planet_data["notes"]:
+                del planet_data["notes"]
+            return planet_data
+        if planet_data == self.baseline:
+            return self.original
+        return merge_planet(self.original, self.baseline, planet_data)
  
 class App(QWidget):
-    def __init__(self):
+    def __init__(self, journal_path=JOURNAL_FILE):
         super().__init__()
+        self.journal_path = journal_path
+        self.journal = None
+        self.next_tab_id = 0
+        self.save_serial = 0
+        self.opened = None  # (path, document, systems key, system name) of the file being edited
+        self.load_worker = None
+        self.loading_planets = []  # opened (planet, planet state) pairs not yet given a tab
 
         self.setWindowTitle('Star System Data Entry')
         self.setGeometry(100, 100, 800, 600)
@@ -438,8 +919,13 @@ class App(QWidget):
 
         self.system_name_le = QLineEdit()
         self.system_name_le.setPlaceholderText("Enter star system name")
+        self.system_name_le.textChanged.connect(lambda text: self.record("system", text))
         self.layout.addWidget(self.system_name_le)
         
+        self.open_btn = QPushButton("Open System")
+        self.open_btn.clicked.connect(self.openSystem)
+        self.layout.addWidget(self.open_btn)
+
          # Add a "Save" button
         self.save_btn = QPushButton("Save Data")
         self.save_btn.clicked.connect(self.save_to_json)
@@ -451,11 +937,68 @@ class App(QWidget):
 
         self.planet_tabs = QTabWidget(self)
         self.layout.addWidget(self.planet_tabs)
-        
 
+        # Save progress; saving runs on a worker thread so data entry carries on meanwhile
+        self.save_worker = None
+        self.save_status = QLabel()
+        self.save_progress = QProgressBar()
+        self.save_progress.hide()
+        status_layout = QHBoxLayout()
+        status_layout.addWidget(self.save_status, 1)
+        status_layout.addWidget(self.save_progress)
+        self.layout.addLayout(status_layout)
+
+        self.startJournal()
+
+    def startJournal(self):
+        """Offer to restore an unsaved session from the journal, then journal this one."""
+        state = read_journal(self.journal_path)
+        if state.dirty and QMessageBox.question(
+                self, "Restore Session",
+                f"An unsaved session with {len(state.tabs)} planet(s) was found. Do you want to restore it?",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes) == QMessageBox.Yes:
+            self.system_name_le.setText(state.system)
+            originals = self.reopenFile(state.opened)
+            for tab_id, planet_state in state.tabs.items():
+                tab = self.newPlanetTab(tab_id, planet_state["name"] or "New Planet")
+                if tab_id in originals:
+                    # Compare against the planet as opened, so only what was edited is merged
+                    tab.setState(planet_state_from_file(originals[tab_id]))
+                    tab.original = originals[tab_id]
+                    tab.baseline = tab.get_data()
+                tab.setState(planet_state)
+            self.next_tab_id = max(state.tabs, default=-1) + 1
+        else:
+            state = JournalState()
+        self.journal = Journal(self.journal_path, state)
+        for index in range(self.planet_tabs.count()):
+            self.planet_tabs.widget(index).journal = self.journal
+
+    def reopenFile(self, opened):
+        """Reload the file a restored session had open, so saving merges into it again.
+
+        Returns {tab id: the planet's entry in the file} for the tabs it was opened into.
+        """
+        if not opened:
+            return {}
+        path, first_tab = opened
+        try:
+            document, key, system_name, planets = load_system_file(path)
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            QMessageBox.warning(self, "Restore Session", f"Could not reopen {path}: {e}\n"
+                                "Saving will write the restored planets to a new file.")
+            return {}
+        self.opened = (path, document, key, system_name)
+        return {first_tab + index: planet for index, planet in enumerate(planets)}
+
+    def record(self, *record):
+        if self.journal is not None:
+            self.journal.record(*record)
 
     def save_to_json(self):
-        """Collate data from all the PlanetTab instances and save to a JSON file."""
+        """Snapshot every PlanetTab and save it to a JSON file on a worker thread."""
+        if self.save_worker is not None or self.load_worker is not None or self.loading_planets:
+            return
         system_name = self.system_name_le.text()
         if not system_name:
             # Display a warning if the system name is not set
@@ -463,39 +1006,155 @@ class App(QWidget):
             return
 
         filename = f"{system_name}.json"
+        key = "system"
+        document = None
 
+        if self.opened is not None and self.opened[3] == system_name:
+            # Write back to the file the system was opened from, keeping the rest of it
+            filename, document, key = self.opened[:3]
         # Check if the file already exists and prompt the user for confirmation
-        if os.path.exists(filename):
+        elif os.path.exists(filename):
             reply = QMessageBox.question(self, "Overwrite Confirmation",
                                          f"The file '{filename}' already exists. Do you want to overwrite it?",
                                          QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
             if reply == QMessageBox.No:
                 return
 
-        system_data = {
-            "Name": system_name,
-            "planets": []
-        }
+        # get_data builds fresh dicts, so the worker never touches a widget; planets
+        # opened from a file are only re-serialized from the widgets if they changed
+        planets = [self.planet_tabs.widget(index).get_file_data() for index in range(self.planet_tabs.count())]
 
-        # Loop through all tabs and collect data
-        for index in range(self.planet_tabs.count()):
-            planet_tab = self.planet_tabs.widget(index)
-            planet_data = planet_tab.get_data()
-            system_data["planets"].append(planet_data)
+        self.save_btn.setEnabled(False)
+        self.open_btn.setEnabled(False)
+        self.save_status.setText(f"Saving {filename}...")
+        self.save_progress.setRange(0, max(len(planets), 1))
+        self.save_progress.setValue(0)
+        self.save_progress.show()
+        self.save_serial += 1
+        serial = self.save_serial
+        self.record("snap", serial)
+        self.save_worker = SaveWorker(filename, system_name, planets, key, document, self)
+        self.save_worker.progress.connect(self.save_progress.setValue)
+        self.save_worker.saved.connect(lambda filename: self.save_status.setText(f"Saved {filename}"))
+        # Marked from the worker thread, so it is journaled even if the window closes first
+        self.save_worker.saved.connect(lambda filename: self.record("saved", serial), Qt.DirectConnection)
+        self.save_worker.failed.connect(self.onSaveFailed)
+        self.save_worker.finished.connect(self.onSaveFinished)
+        self.save_worker.start()
 
-        # Structure the data for JSON serialization
-        final_data = {
-            "system": [system_data]
-        }
+    def openSystem(self):
+        """Pick a system file and load it into the tabs, replacing the current ones."""
+        if self.save_worker is not None or self.load_worker is not None or self.loading_planets:
+            return
+        if self.planet_tabs.count() and QMessageBox.question(
+                self, "Open System", "Replace the planets being edited?",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No) == QMessageBox.No:
+            return
+        filename, _ = QFileDialog.getOpenFileName(self, "Open System", "Systems", "System files (*.json)")
+        if filename:
+            self.loadSystem(filename)
+
+    def loadSystem(self, filename):
+        """Read a system file on a worker thread; its planets become tabs once it is parsed."""
+        self.setBusy(True)
+        self.save_status.setText(f"Opening {filename}...")
+        self.load_worker = LoadWorker(filename, self)
+        self.load_worker.loaded.connect(self.onLoaded)
+        self.load_worker.failed.connect(self.onLoadFailed)
+        self.load_worker.finished.connect(self.onLoadFinished)
+        self.load_worker.start()
+
+    def onLoaded(self, filename, document, key, system_name, planets):
+        while self.planet_tabs.count():
+            tab = self.planet_tabs.widget(0)
+            tab.deletePlanet()
+            tab.deleteLater()
+        self.system_name_le.setText(system_name)
+        self.opened = (filename, document, key, system_name)
+        self.record("open", filename, self.next_tab_id)
+        self.loading_planets = planets
+        self.save_progress.setRange(0, max(len(planets), 1))
+        self.save_progress.setValue(0)
+        self.save_progress.show()
+        if len(document[key]) > 1:
+            QMessageBox.warning(self, "Open System",
+                                f"'{filename}' lists {len(document[key])} systems; only the first, '{system_name}', "
+                                "is opened. Saving keeps the others as they are.")
+        QTimer.singleShot(0, self.addLoadedPlanets)
+
+    def addLoadedPlanets(self):
+        """Give the next few opened planets their tabs, a batch per event loop turn so the window stays live.
+
+        Each tab only fills its eager widgets here; traits, resources and organisms
+        are built the first time it is shown.
+        """
+        batch, self.loading_planets = self.loading_planets[:OPEN_BATCH], self.loading_planets[OPEN_BATCH:]
+        for planet, planet_state in batch:
+            tab_id = self.next_tab_id
+            self.next_tab_id += 1
+            self.record("add", tab_id)
+            for record in planet_records(tab_id, planet_state):
+                self.record(*record)
+            tab = self.newPlanetTab(tab_id, planet_state["name"] or "New Planet")
+            tab.setState(planet_state)
+            tab.original = planet
+            tab.baseline = tab.get_data()
+        self.save_progress.setValue(self.planet_tabs.count())
+        if self.loading_planets:
+            QTimer.singleShot(0, self.addLoadedPlanets)
+            return
+        # Nothing differs from the file yet, so the journal has nothing unsaved
+        self.save_serial += 1
+        self.record("snap", self.save_serial)
+        self.record("saved", self.save_serial)
+        self.save_status.setText(f"Opened {self.opened[0]}")
+        self.save_progress.hide()
+        self.setBusy(False)
+
+    def onLoadFailed(self, message):
+        self.save_status.setText("Open failed")
+        QMessageBox.warning(self, "Error", message)
+
+    def onLoadFinished(self):
+        self.load_worker.deleteLater()
+        self.load_worker = None
+        if not self.loading_planets:
+            self.setBusy(False)
+
+    def setBusy(self, busy):
+        """Disable the buttons that would clash with a file being opened."""
+        for button in (self.open_btn, self.save_btn, self.add_planet_btn):
+            button.setEnabled(not busy)
+
+    def onSaveFailed(self, message):
+        self.save_status.setText("Save failed")
+        QMessageBox.warning(self, "Error", message)
+
+    def onSaveFinished(self):
+        self.save_worker.deleteLater()
+        self.save_worker = None
+        self.save_progress.hide()
+        self.save_btn.setEnabled(True)
+        self.open_btn.setEnabled(True)
+
+    def closeEvent(self, event):
+        # Let a running save finish rather than leave its temp file behind
+        for worker in (self.save_worker, self.load_worker):
+            if worker is not None:
+                worker.wait()
+        self.journal.close()
+        super().closeEvent(event)
 
-        # Serialize and save to a JSON file
-        with open(filename, "w") as file:
-            json.dump(final_data, file, indent=4)
+    def newPlanetTab(self, tab_id, title="New Planet"):
+        new_tab = PlanetTab(self.planet_tabs, journal=self.journal, tab_id=tab_id)  # Pass the QTabWidget to PlanetTab
+        self.planet_tabs.addTab(new_tab, title)
+        return new_tab
 
     def addPlanet(self):
         """Function to add a new tab for planet data entry"""
-        new_tab = PlanetTab(self.planet_tabs)  # Pass the QTabWidget to PlanetTab
-        self.planet_tabs.addTab(new_tab, "New Planet")
+        self.record("add", self.next_tab_id)
+        self.newPlanetTab(self.next_tab_id)
+        self.next_tab_id += 1
         
 
 
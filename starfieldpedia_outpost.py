@@ -0,0 +1,165 @@
+from collections import namedtuple
+
+from starfieldpedia_index import iter_bits
+
+# Planets listed by rank_planets unless told otherwise.
+RANK_LIMIT = 20
+# Search nodes exact_cover visits before settling for the best cover found so far.
+EXACT_NODE_LIMIT = 200000
+
+# A candidate outpost plan: planet row ids, the target resources they cover and miss,
+# and the summed weight of the covered ones. row_covers maps each row to the targets
+# it covers; for covers, alternatives maps each row to the other rows that cover
+# exactly the same targets.
+OutpostPlan = namedtuple('OutpostPlan', 'rows covered missing score row_covers alternatives')
+
+
+def resource_weight(details):
+    """Weight of a resource from its Resources JSON entry; rarer and pricier ones count more."""
+    rarity, value = details.get("rarity"), details.get("value")
+    rarity = rarity if isinstance(rarity, int) else 0
+    value = value if isinstance(value, (int, float)) else 1
+    return (1 + rarity) * max(value, 1)
+
+
+class OutpostOptimizer:
+    """Rank planets, and find small sets of planets, whose outposts cover a set of target resources.
+
+    Work is done on small masks with one bit per target resource, gathered from the
+    resource index's row lists, so only planets offering at least one target are
+    ever looked at. An organic resource only counts on a planet where an organism
+    yielding it can be farmed from an outpost (or where that is unknown, if
+    allow_unknown is set); organic resources a planet lists without any organism
+    providing them count as they are.
+    """
+
+    def __init__(self, resource_index, organism_index, weights=None, allow_unknown=True):
+        self.resource_index = resource_index
+        self.organism_index = organism_index
+        self.weights = weights or {}
+        self.allow_unknown = allow_unknown
+
+    def resolve(self, targets):
+        """Return the target names as spelled in the index; raises ValueError for unknown ones."""
+        names = {name.lower(): name for name in self.resource_index.resource_names}
+        resolved = []
+        for target in targets:
+            name = names.get(target.strip().lower())
+            if name is None:
+                raise ValueError(f"Unknown resource: {target.strip()}")
+            if name not in resolved:
+                resolved.append(name)
+        return resolved
+
+    def _rows(self, name):
+        """Row ids where a resource can be gathered by an outpost."""
+        rows = set(self.resource_index.lookup(name))
+        providers = self.organism_index.providers(name)
+        if providers:
+            # Planets whose organisms yield it only count if one of those can be farmed
+            farmable = {True, None} if self.allow_unknown else {True}
+            rows -= {row for row, _ in providers}
+            rows.update(row for row, outpost in providers if outpost in farmable)
+        return rows
+
+    def coverage(self, targets):
+        """Return ({row: target mask}, resolved target names); bit i of a mask is targets[i]."""
+        targets = self.resolve(targets)
+        masks = {}
+        for bit, name in enumerate(targets):
+            for row in self._rows(name):
+                masks[row] = masks.get(row, 0) | 1 << bit
+        return masks, targets
+
+    def _score(self, mask, targets):
+        return sum(self.weights.get(targets[bit], 1) for bit in iter_bits(mask))
+
+    def _plan(self, chosen, covered, targets, groups):
+        """Build an OutpostPlan from chosen target masks, each represented by its first row."""
+        rows = [groups[mask][0] for mask in chosen]
+        names = [targets[bit] for bit in iter_bits(covered)]
+        row_covers = {groups[mask][0]: [targets[bit] for bit in iter_bits(mask)] for mask in chosen}
+        return OutpostPlan(rows, names, [name for name in targets if name not in names], self._score(covered, targets),
+                           row_covers, {groups[mask][0]: groups[mask][1:] for mask in chosen})
+
+    def _candidates(self, targets):
+        """Return (targets, {mask: rows}, masks worth considering for a cover).
+
+        Rows covering the same targets are grouped under one mask, and masks covered
+        by a strictly larger one are dropped.
+        """
+        masks, targets = self.coverage(targets)
+        groups = {}
+        for row in sorted(masks):
+            groups.setdefault(masks[row], []).append(row)
+        kept = []
+        for mask in sorted(groups, key=lambda mask: -bin(mask).count("1")):
+            if not any(mask & other == mask for other in kept):
+                kept.append(mask)
+        return targets, groups, kept
+
+    def rank_planets(self, targets, limit=RANK_LIMIT):
+        """Return single-planet plans, best coverage first: weighted score, then targets covered."""
+        targets, groups, _ = self._candidates(targets)
+        ranked = sorted(groups, key=lambda mask: (-self._score(mask, targets), -bin(mask).count("1")))
+        plans = []
+        for mask in ranked:
+            for row in groups[mask]:
+                plans.append(self._plan([mask], mask, targets, {mask: [row]}))
+                if len(plans) == limit:
+                    return plans
+        return plans
+
+    def greedy_cover(self, targets):
+        """Cover the targets by repeatedly taking the planet that adds the most uncovered weight."""
+        targets, groups, kept = self._candidates(targets)
+        chosen, covered = self._greedy(targets, kept)
+        return self._plan(chosen, covered, targets, groups)
+
+    def _greedy(self, targets, kept):
+        reachable = 0
+        for mask in kept:
+            reachable |= mask
+        covered, chosen = 0, []
+        while covered != reachable:
+            best = max(kept, key=lambda mask: self._score(mask & ~covered, targets))
+            chosen.append(best)
+            covered |= best
+        return chosen, covered
+
+    def exact_cover(self, targets, node_limit=EXACT_NODE_LIMIT):
+        """Return a plan with as few planets as possible covering every reachable target.
+
+        Branch and bound over the distinct planet masks: the greedy cover is the first
+        bound, each step branches on the uncovered target with the fewest candidates,
+        and branches that cannot beat the best cover found so far are cut. Past
+        node_limit search nodes the best cover found so far is returned.
+        """
+        targets, groups, kept = self._candidates(targets)
+        best, reachable = self._greedy(targets, kept)
+        by_bit = {bit: [mask for mask in kept if mask >> bit & 1] for bit in iter_bits(reachable)}
+        widest = max((bin(mask).count("1") for mask in kept), default=1)
+        nodes = 0
+        seen = {}  # uncovered mask -> fewest planets it was reached with
+
+        def search(uncovered, chosen):
+            nonlocal best, nodes
+            if not uncovered:
+                if len(chosen) < len(best):
+                    best = list(chosen)
+                return
+            nodes += 1
+            # Every further planet covers at most `widest` targets
+            if nodes > node_limit or len(chosen) - (-bin(uncovered).count("1") // widest) >= len(best):
+                return
+            if seen.get(uncovered, len(best)) <= len(chosen):
+                return
+            seen[uncovered] = len(chosen)
+            bit = min(iter_bits(uncovered), key=lambda bit: len(by_bit[bit]))
+            for mask in sorted(by_bit[bit], key=lambda mask: -bin(mask & uncovered).count("1")):
+                chosen.append(mask)
+                search(uncovered & ~mask, chosen)
+                chosen.pop()
+
+        search(reachable, [])
+        return self._plan(best, reachable, targets, groups)
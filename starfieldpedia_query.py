@@ -0,0 +1,389 @@
+import re
+import math
+from bisect import bisect_left, bisect_right
+
+from starfieldpedia_index import iter_bits
+
+# Planet attributes that can be used in queries, besides resources and gravity.
+QUERY_FIELDS = ('type', 'temperature', 'atmosphere', 'magnetosphere')
+# Organism attributes that can be used in organism queries, e.g. "biome:Swamp" or "yields:Sealant".
+ORGANISM_FIELDS = ('biome', 'temperament', 'yields', 'kind', 'outpost')
+# Organism kinds by OrganismSource.kind, and outpost flags by OrganismSource.outpost, as queried.
+ORGANISM_KINDS = ('fauna', 'flora')
+OUTPOST_VALUES = {True: 'yes', False: 'no', None: 'unknown'}
+
+TOKEN_PATTERN = re.compile(r'\s*(\(|\)|"[^"]*"|\b(?:AND|OR|NOT)\b)\s*', re.IGNORECASE)
+TERM_PATTERN = re.compile(r'^(\w+)\s*(<=|>=|<|>|=|:)\s*(.+)$')
+
+
+class QuerySyntaxError(ValueError):
+    """Raised for malformed queries and unknown resource or attribute names."""
+
+
+def bitset_from_rows(rows, size):
+    """Pack row ids into an int with one bit per planet."""
+    bits = bytearray((size + 7) // 8)
+    for row in rows:
+        bits[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(bits, 'little')
+
+
+class BitsetQuery:
+    """Boolean query grammar (AND, OR, NOT and parentheses) evaluated over int bitsets.
+
+    Subclasses provide universe, the bitset of everything a query can match, and
+    _term(text), which resolves one term to a bitset.
+    """
+
+    def evaluate(self, text):
+        """Evaluate a query string to a bitset."""
+        tokens = [token for token in TOKEN_PATTERN.split(text) if token and token.strip()]
+        if not tokens:
+            return self.universe
+        bits, pos = self._parse_or(tokens, 0)
+        if pos != len(tokens):
+            raise QuerySyntaxError(f"Unexpected '{tokens[pos]}'")
+        return bits
+
+    def _parse_or(self, tokens, pos):
+        bits, pos = self._parse_and(tokens, pos)
+        while pos < len(tokens) and tokens[pos].upper() == 'OR':
+            other, pos = self._parse_and(tokens, pos + 1)
+            bits |= other
+        return bits, pos
+
+    def _parse_and(self, tokens, pos):
+        bits, pos = self._parse_not(tokens, pos)
+        while pos < len(tokens) and tokens[pos].upper() == 'AND':
+            other, pos = self._parse_not(tokens, pos + 1)
+            bits &= other
+        return bits, pos
+
+    def _parse_not(self, tokens, pos):
+        if pos < len(tokens) and tokens[pos].upper() == 'NOT':
+            bits, pos = self._parse_not(tokens, pos + 1)
+            return self.universe & ~bits, pos
+        return self._parse_atom(tokens, pos)
+
+    def _parse_atom(self, tokens, pos):
+        if pos >= len(tokens):
+            raise QuerySyntaxError("Query ends unexpectedly")
+        token = tokens[pos]
+        if token == '(':
+            bits, pos = self._parse_or(tokens, pos + 1)
+            if pos >= len(tokens) or tokens[pos] != ')':
+                raise QuerySyntaxError("Missing ')'")
+            return bits, pos + 1
+        if token == ')' or token.upper() in ('AND', 'OR', 'NOT'):
+            raise QuerySyntaxError(f"Unexpected '{token}'")
+        return self._term(token.strip().strip('"')), pos + 1
+
+
+class QueryEngine(BitsetQuery):
+    """Evaluate boolean planet queries as bitwise operations across every planet at once.
+
+    Each resource and each attribute value is stored as one int with a bit per planet
+    row, so "Helium-3 AND Water AND NOT Inferno" is two ANDs and an inversion no
+    matter how many planets the catalog holds.
+    """
+
+    def __init__(self, resource_index, planet_index):
+        self.resource_index = resource_index
+        self.planet_index = planet_index
+        self.size = 0  # one past the highest row id seen, so bitsets cover every row
+        self.all_planets = 0
+        self._resources = {}
+        self._fields = {field: {} for field in QUERY_FIELDS}
+        self._gravity_values = []
+        self._gravity_rows = []
+        self._row_keys = {}  # row id -> (resource keys, attribute values, gravity), for removal
+
+    @property
+    def universe(self):
+        return self.all_planets
+
+    @classmethod
+    def from_catalog(cls, catalog, resource_index, planet_index):
+        """Build the bitsets for every planet of a compiled catalog."""
+        engine = cls(resource_index, planet_index)
+        engine.add_rows(range(len(catalog)), catalog.summary_columns())
+        return engine
+
+    def add_rows(self, rows, columns):
+        """Index new row ids; columns holds their attributes as {column: list}, in row order.
+
+        Rows must already be in the resource index. Bits are gathered per resource and
+        attribute value first, so each bitset is widened once per call, not once per row.
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        self.size = max(self.size, max(rows) + 1)
+        groups = {}
+        for pos, row in enumerate(rows):
+            resources = tuple(name.lower() for name in self.resource_index.resources(row))
+            values = tuple(str(columns[field][pos]).lower() for field in QUERY_FIELDS)
+            gravity = columns['gravity'][pos]
+            self._row_keys[row] = (resources, values, gravity)
+            for key in resources:
+                groups.setdefault((None, key), []).append(row)
+            for field, value in zip(QUERY_FIELDS, values):
+                groups.setdefault((field, value), []).append(row)
+            if not math.isnan(gravity):
+                pos = bisect_right(self._gravity_values, gravity)
+                self._gravity_values.insert(pos, gravity)
+                self._gravity_rows.insert(pos, row)
+
+        self.all_planets |= bitset_from_rows(rows, self.size)
+        for (field, key), group in groups.items():
+            bucket = self._resources if field is None else self._fields[field]
+            bucket[key] = bucket.get(key, 0) | bitset_from_rows(group, self.size)
+
+    def remove_rows(self, rows):
+        """Drop row ids, e.g. the planets of a system file that changed or vanished."""
+        for row in rows:
+            keys = self._row_keys.pop(row, None)
+            if keys is None:
+                continue
+            resources, values, gravity = keys
+            bit = ~(1 << row)
+            self.all_planets &= bit
+            for key in resources:
+                self._resources[key] &= bit
+            for field, value in zip(QUERY_FIELDS, values):
+                self._fields[field][value] &= bit
+            if not math.isnan(gravity):
+                pos = bisect_left(self._gravity_values, gravity)
+                while self._gravity_rows[pos] != row:
+                    pos += 1
+                del self._gravity_values[pos]
+                del self._gravity_rows[pos]
+
+    def is_resource(self, name):
+        """Check whether name is a resource, even one no loaded planet offers yet."""
+        key = name.lower()
+        return key in self._resources or any(key == known.lower() for known in self.resource_index.resource_names)
+
+    def resource(self, name):
+        """Bitset of planets offering a resource."""
+        if not self.is_resource(name):
+            raise QuerySyntaxError(f"Unknown resource: {name}")
+        return self._resources.get(name.lower(), 0)
+
+    def field(self, field, value):
+        """Bitset of planets whose attribute equals value (case-insensitive)."""
+        if field not in self._fields:
+            raise QuerySyntaxError(f"Unknown planet attribute: {field}")
+        return self._fields[field].get(value.lower(), 0)
+
+    def gravity(self, low=None, high=None):
+        """Bitset of planets with low <= gravity <= high; either bound may be open."""
+        start = 0 if low is None else bisect_left(self._gravity_values, low)
+        end = len(self._gravity_values) if high is None else bisect_right(self._gravity_values, high)
+        return bitset_from_rows(self._gravity_rows[start:end], self.size)
+
+    def select(self, all_of=(), any_of=(), none_of=(), gravity=None, **fields):
+        """Return row ids matching every resource in all_of, one in any_of and none in none_of.
+
+        Attribute filters are passed as keywords (temperature="Frozen") and may hold a
+        list of accepted values; gravity is a (low, high) tuple.
+        """
+        bits = self.all_planets
+        for name in all_of:
+            bits &= self.resource(name)
+        if any_of:
+            either = 0
+            for name in any_of:
+                either |= self.resource(name)
+            bits &= either
+        for name in none_of:
+            bits &= ~self.resource(name)
+        for field, values in fields.items():
+            if isinstance(values, str):
+                values = [values]
+            either = 0
+            for value in values:
+                either |= self.field(field, value)
+            bits &= either
+        if gravity is not None:
+            bits &= self.gravity(*gravity)
+        return list(iter_bits(bits))
+
+    def query(self, text):
+        """Return the row ids matching a query such as 'Helium-3 AND Water AND NOT Inferno'."""
+        return list(iter_bits(self.evaluate(text)))
+
+    def _term(self, term):
+        """Resolve one term: a resource, an attribute value, name:planet, field:value or gravity bounds."""
+        match = TERM_PATTERN.match(term)
+        if match:
+            field, op, value = match.group(1).lower(), match.group(2), match.group(3).strip()
+            if field == 'gravity':
+                return self._gravity_term(op, value)
+            if op not in (':', '='):
+                raise QuerySyntaxError(f"'{op}' only works with gravity")
+            if field == 'name':
+                return bitset_from_rows(self.planet_index.rows(value), self.size)
+            return self.field(field, value)
+
+        if self.is_resource(term):
+            return self.resource(term)
+        # A bare attribute value such as "Inferno" matches whichever attribute has it.
+        bits = 0
+        found = False
+        for values in self._fields.values():
+            if term.lower() in values:
+                bits |= values[term.lower()]
+                found = True
+        if not found:
+            # Last resort: a planet name typed on its own.
+            rows = self.planet_index.rows(term)
+            if not rows:
+                raise QuerySyntaxError(f"Unknown resource, planet attribute or planet: {term}")
+            bits = bitset_from_rows(rows, self.size)
+        return bits
+
+    def _gravity_term(self, op, value):
+        try:
+            if op in (':', '=') and '..' in value:
+                low, high = value.split('..', 1)
+                return self.gravity(float(low) if low else None, float(high) if high else None)
+            number = float(value)
+        except ValueError:
+            raise QuerySyntaxError(f"Bad gravity value: {value}")
+        if op in ('<', '<='):
+            bits = self.gravity(None, number)
+            if op == '<':
+                bits &= ~self.gravity(number, number)
+            return bits
+        if op in ('>', '>='):
+            bits = self.gravity(number, None)
+            if op == '>':
+                bits &= ~self.gravity(number, number)
+            return bits
+        return self.gravity(number, number)
+
+
+class OrganismQueryEngine(BitsetQuery):
+    """Boolean organism queries over bitsets with one bit per organism, across every system.
+
+    Organisms carry the ids their OrganismIndex gave them; each biome, temperament,
+    yielded resource, kind and outpost flag is one int over those ids, so
+    "Deciduous Forest AND Mountains AND Peaceful AND yields:Sealant" is three ANDs.
+    Results map back, through the index, to OrganismSource entries and to the planet
+    rows they live on.
+    """
+
+    def __init__(self, organism_index):
+        self.organism_index = organism_index
+        self.resource_names = organism_index.resource_names  # shared, so new resources show up
+        self.all_organisms = 0
+        self._fields = {field: {} for field in ORGANISM_FIELDS}
+
+    @property
+    def universe(self):
+        return self.all_organisms
+
+    def add_organisms(self, organisms, ids):
+        """Index an OrganismColumns run under the ids the index gave it; bitsets are widened once per call."""
+        if not ids:
+            return
+        groups = {}
+        for oid, kind, outpost, mask, biomes, temperament in zip(ids, organisms.kinds, organisms.outposts,
+                                                                   organisms.masks, organisms.biomes,
+                                                                   organisms.temperaments):
+            keys = [('biome', biome.lower()) for biome in biomes]
+            keys += [('yields', self.resource_names[bit].lower()) for bit in iter_bits(mask)]
+            keys += [('kind', ORGANISM_KINDS[kind]), ('outpost', OUTPOST_VALUES[outpost])]
+            if temperament:
+                keys.append(('temperament', temperament.lower()))
+            for key in keys:
+                groups.setdefault(key, []).append(oid)
+
+        size = ids.stop
+        self.all_organisms |= bitset_from_rows(ids, size)
+        for (field, value), group in groups.items():
+            bucket = self._fields[field]
+            bucket[value] = bucket.get(value, 0) | bitset_from_rows(group, size)
+
+    def remove_ids(self, ids):
+        """Drop organisms, e.g. the ones OrganismIndex.remove_rows removed."""
+        if not ids:
+            return
+        keep = ~bitset_from_rows(ids, max(ids) + 1)
+        self.all_organisms &= keep
+        for bucket in self._fields.values():
+            for value in bucket:
+                bucket[value] &= keep
+
+    def values(self, field):
+        """Return the values of a field that some organism has, e.g. every biome seen so far."""
+        if field not in self._fields:
+            raise QuerySyntaxError(f"Unknown organism attribute: {field}")
+        return sorted(value for value, bits in self._fields[field].items() if bits)
+
+    def field(self, field, value):
+        """Bitset of organisms whose attribute equals value (case-insensitive)."""
+        if field not in self._fields:
+            raise QuerySyntaxError(f"Unknown organism attribute: {field}")
+        if field == 'yields' and not any(value.lower() == name.lower() for name in self.resource_names):
+            raise QuerySyntaxError(f"Unknown resource: {value}")
+        return self._fields[field].get(value.lower(), 0)
+
+    def biome(self, name):
+        """Bitset of organisms living in a biome."""
+        return self.field('biome', name)
+
+    def select(self, biomes=(), temperament=None, yields=(), kind=None, outpost=None):
+        """Return the OrganismSource entries living in every biome and yielding every resource given.
+
+        temperament may be one value or a list of accepted ones; kind is 'fauna' or
+        'flora' and outpost 'yes', 'no' or 'unknown', as in queries.
+        """
+        bits = self.all_organisms
+        for name in biomes:
+            bits &= self.field('biome', name)
+        for name in yields:
+            bits &= self.field('yields', name)
+        if temperament is not None:
+            if isinstance(temperament, str):
+                temperament = [temperament]
+            either = 0
+            for value in temperament:
+                either |= self.field('temperament', value)
+            bits &= either
+        if kind is not None:
+            bits &= self.field('kind', kind)
+        if outpost is not None:
+            bits &= self.field('outpost', outpost)
+        return self.sources(bits)
+
+    def sources(self, bits):
+        """Return the OrganismSource entries of an organism bitset, in id order."""
+        return self.organism_index.sources(iter_bits(bits))
+
+    def planet_rows(self, bits):
+        """Return the sorted planet row ids the organisms of a bitset live on."""
+        rows = self.organism_index.rows
+        return sorted({rows[oid] for oid in iter_bits(bits)})
+
+    def query(self, text):
+        """Return the OrganismSource entries matching a query such as 'Swamp AND Peaceful AND yields:Sealant'."""
+        return self.sources(self.evaluate(text))
+
+    def _term(self, term):
+        """Resolve one term: field:value, or a bare biome, temperament, resource or kind."""
+        match = TERM_PATTERN.match(term)
+        if match:
+            field, op, value = match.group(1).lower(), match.group(2), match.group(3).strip()
+            if op not in (':', '='):
+                raise QuerySyntaxError(f"'{op}' does not work with organism attributes")
+            return self.field(field, value)
+
+        key = term.lower()
+        for field in ('biome', 'temperament', 'yields', 'kind'):
+            if key in self._fields[field]:
+                return self._fields[field][key]
+        if any(key == name.lower() for name in self.resource_names):
+            return 0  # a resource no loaded organism yields
+        raise QuerySyntaxError(f"Unknown biome, temperament, resource or kind: {term}")
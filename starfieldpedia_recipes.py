@@ -0,0 +1,136 @@
+import os
+import json
+from collections import namedtuple
+
+RECIPES_DIRECTORY = "Recipes"
+RECIPES_FILE = "recipes.json"
+
+# One crafting recipe: its category ("suit", "weapons", ...) and (resource, quantity) pairs.
+Recipe = namedtuple('Recipe', 'name category requirements')
+
+
+class RecipeError(ValueError):
+    """Raised for recipe files that cannot be read and for recipes that require themselves."""
+
+
+def strip_json_comments(text):
+    """Remove // and /* */ comments and trailing commas so hand-edited JSON parses.
+
+    Everything inside string literals is left alone.
+    """
+    out = []
+    pos, length = 0, len(text)
+    while pos < length:
+        char = text[pos]
+        if char == '"':
+            end = pos + 1
+            while end < length and text[end] != '"':
+                end += 2 if text[end] == '\\' else 1
+            out.append(text[pos:end + 1])
+            pos = end + 1
+        elif text.startswith('//', pos):
+            end = text.find('\n', pos)
+            pos = length if end == -1 else end
+        elif text.startswith('/*', pos):
+            end = text.find('*/', pos + 2)
+            pos = length if end == -1 else end + 2
+        elif char in '}]':
+            # Drop a comma left dangling before the closing bracket
+            for idx in range(len(out) - 1, -1, -1):
+                piece = out[idx].rstrip()
+                if piece:
+                    if piece.endswith(','):
+                        out[idx] = piece[:-1]
+                    break
+                out[idx] = ''
+            out.append(char)
+            pos += 1
+        else:
+            out.append(char)
+            pos += 1
+    return ''.join(out)
+
+
+def load_recipes(recipes_directory=RECIPES_DIRECTORY):
+    """Read the recipe file, tolerating comments and trailing commas; returns a list of Recipe."""
+    path = os.path.join(recipes_directory, RECIPES_FILE)
+    with open(path, 'r') as f:
+        text = f.read()
+    try:
+        document = json.loads(strip_json_comments(text))
+    except json.JSONDecodeError as e:
+        raise RecipeError(f"{path}: {e}")
+    recipes = []
+    for category, entries in document.get("crafting_recipes", {}).items():
+        for entry in entries:
+            requirements = tuple((requirement["resource"], requirement.get("quantity", 1))
+                                 for requirement in entry.get("requirements", []))
+            recipes.append(Recipe(entry["name"], category, requirements))
+    return recipes
+
+
+class RecipeBook:
+    """Expand crafted items into the raw resources they take, across nested recipes.
+
+    Anything without a recipe of its own is raw. The per-unit demand of each item is
+    computed once, by memoized recursion over the recipe graph, and reused for every
+    later expansion and for every recipe that requires it. A recipe that ends up
+    requiring itself raises RecipeError naming the cycle. Names ignore case.
+    """
+
+    def __init__(self, recipes=()):
+        self.recipes = {}
+        for recipe in recipes:
+            self.recipes[recipe.name.casefold()] = recipe
+        self._demand = {}  # casefolded item name -> {raw resource: quantity per unit}
+
+    @classmethod
+    def from_file(cls, recipes_directory=RECIPES_DIRECTORY):
+        return cls(load_recipes(recipes_directory))
+
+    def __contains__(self, name):
+        return name.casefold() in self.recipes
+
+    def names(self):
+        """Return the names of every craftable item, sorted."""
+        return sorted(recipe.name for recipe in self.recipes.values())
+
+    def expand(self, item, quantity=1):
+        """Return {raw resource: total quantity} needed to craft quantity of an item."""
+        return {name: amount * quantity for name, amount in self._unit_demand(item, ()).items()}
+
+    def plan(self, items):
+        """Return the combined raw demand of {item: quantity}, e.g. a whole shopping list."""
+        demand = {}
+        for item, quantity in items.items():
+            for name, amount in self._unit_demand(item, ()).items():
+                demand[name] = demand.get(name, 0) + amount * quantity
+        return demand
+
+    def _unit_demand(self, item, path):
+        key = item.casefold()
+        demand = self._demand.get(key)
+        if demand is not None:
+            return demand
+        recipe = self.recipes.get(key)
+        if recipe is None:
+            return {item: 1}  # raw; not memoized since it costs nothing
+        if key in path:
+            cycle = [self.recipes[name].name for name in path[path.index(key):]] + [recipe.name]
+            raise RecipeError("Recipe cycle: " + " -> ".join(cycle))
+        demand = {}
+        for name, quantity in recipe.requirements:
+            for raw, amount in self._unit_demand(name, path + (key,)).items():
+                demand[raw] = demand.get(raw, 0) + amount * quantity
+        self._demand[key] = demand
+        return demand
+
+    def sources(self, demand, resource_index):
+        """Join a demand against the planet index: {raw resource: sorted planet row ids offering it}.
+
+        Raw inputs that are not catalog resources (e.g. a placeholder such as "Herbs")
+        map to an empty list.
+        """
+        names = {name.casefold(): name for name in resource_index.resource_names}
+        return {raw: list(resource_index.lookup(names[raw.casefold()])) if raw.casefold() in names else []
+                for raw in demand}
@@ -0,0 +1,125 @@
+import math
+from array import array
+
+from starfieldpedia_catalog import PLANET_STRING_COLUMNS
+
+# Planet attributes in planet list order; every one but gravity is stored as category codes.
+PLANET_COLUMNS = ('name', 'system', 'type', 'gravity', 'temperature', 'atmosphere', 'magnetosphere')
+CATEGORICAL_COLUMNS = ('name', 'system') + tuple(key for _, key in PLANET_STRING_COLUMNS)
+
+
+def _row_bytes(resource_count):
+    """Bytes per bitset row, rounded up to a multiple of 8 so new resources rarely widen it."""
+    return max(8, (resource_count + 63) // 64 * 8)
+
+
+class PlanetStore:
+    """Typed, columnar planet table indexed directly by row id.
+
+    Strings are stored as array('I') codes into one shared category table, gravity
+    as float32, and resource masks as a packed bitset matrix with one fixed-width
+    row per planet; the ResourceIndex and the resource filters read masks from it
+    rather than keeping their own. Rows are only ever appended; remove_rows marks
+    them dead but keeps their masks, so the ids of other rows never shift and
+    indexes can still find a dead row's buckets. Organisms are not stored here; the
+    organism index keeps their ids and decodes their details on demand.
+    """
+
+    def __init__(self, resource_names=()):
+        self.resource_names = list(resource_names)
+        self.categories = []
+        self._category_codes = {}
+        self.codes = {column: array('I') for column in CATEGORICAL_COLUMNS}
+        self.gravity = array('f')
+        self.row_bytes = _row_bytes(len(self.resource_names))
+        self.bitsets = bytearray()
+        self.live = bytearray()
+        self._live_count = 0
+
+    def __len__(self):
+        return self._live_count
+
+    def __contains__(self, row):
+        return 0 <= row < len(self.live) and bool(self.live[row])
+
+    @property
+    def size(self):
+        """Number of row ids handed out so far, dead rows included."""
+        return len(self.live)
+
+    @property
+    def index(self):
+        """Live row ids in ascending order."""
+        return [row for row, alive in enumerate(self.live) if alive]
+
+    def code(self, value):
+        """Return the category code of a string, adding it on first use."""
+        value = "" if value is None else str(value)
+        code = self._category_codes.get(value)
+        if code is None:
+            code = self._category_codes[value] = len(self.categories)
+            self.categories.append(value)
+        return code
+
+    def extend_names(self, resource_names):
+        """Add bits for resources first seen after the store was created."""
+        self.resource_names.extend(resource_names[len(self.resource_names):])
+        row_bytes = _row_bytes(len(self.resource_names))
+        if row_bytes != self.row_bytes:
+            old, pad = self.row_bytes, bytes(row_bytes - self.row_bytes)
+            self.bitsets = bytearray(b"".join(self.bitsets[pos:pos + old] + pad
+                                              for pos in range(0, len(self.bitsets), old)))
+            self.row_bytes = row_bytes
+
+    def add_rows(self, rows, columns, masks):
+        """Append planets; rows must continue the row ids handed out so far.
+
+        columns holds their attributes as {column: list} in row order, masks their
+        resource bitmasks as ints.
+        """
+        if len(rows) and rows[0] != self.size:
+            raise ValueError(f"Row ids must continue at {self.size}, got {rows[0]}")
+        for column, codes in self.codes.items():
+            codes.extend(self.code(value) for value in columns[column])
+        self.gravity.extend(columns['gravity'])
+        for mask in masks:
+            self.bitsets += mask.to_bytes(self.row_bytes, 'little')
+        self.live.extend(b"\x01" * len(rows))
+        self._live_count += len(rows)
+
+    def remove_rows(self, rows):
+        """Mark rows dead, e.g. the planets of a system file that changed or vanished."""
+        for row in rows:
+            if row in self:
+                self.live[row] = 0
+                self._live_count -= 1
+
+    def mask(self, row):
+        """Return the resource bitmask of a row as an int."""
+        start = row * self.row_bytes
+        return int.from_bytes(self.bitsets[start:start + self.row_bytes], 'little')
+
+    def value(self, row, column):
+        """Return one attribute of a row."""
+        if column == 'gravity':
+            gravity = self.gravity[row]
+            # float32 holds the two-decimal values exactly enough; print them as written
+            return gravity if math.isnan(gravity) else float(format(gravity, '.7g'))
+        return self.categories[self.codes[column][row]]
+
+    def values(self, row, columns=PLANET_COLUMNS):
+        return tuple(self.value(row, column) for column in columns)
+
+    def column(self, column):
+        """Return a column as a list indexed by row id, dead rows included."""
+        if column == 'gravity':
+            return [self.value(row, column) for row in range(self.size)]
+        categories = self.categories
+        return [categories[code] for code in self.codes[column]]
+
+    def memory_usage(self):
+        """Approximate bytes held by the store's columns and category table."""
+        total = sum(codes.itemsize * len(codes) for codes in self.codes.values())
+        total += self.gravity.itemsize * len(self.gravity) + len(self.bitsets) + len(self.live)
+        total += sum(len(value) + 49 for value in self.categories)
+        return total
@@ -0,0 +1,205 @@
+import sys
+import json
+import codecs
+import hashlib
+
+# Bytes read from disk at a time while streaming a system file.
+CHUNK_SIZE = 1 << 20
+
+# Keys of the system file schema, by lowercased spelling. Any other key, i.e. a
+# resource name, keeps its case.
+SCHEMA_KEYS = {key: sys.intern(key) for key in (
+    'systems', 'system', 'name', 'planets', 'notes', 'type', 'gravity', 'temperature', 'atmosphere',
+    'magnetosphere', 'traits', 'resources', 'fauna', 'flora', 'temperament', 'biomes', 'outpost')}
+# The JSON creator writes its systems under "system".
+SYSTEMS_KEYS = ('systems', 'system')
+# Values repeated across planets and organisms, kept as one shared string each.
+INTERNED_VALUES = frozenset(('type', 'temperature', 'atmosphere', 'magnetosphere', 'temperament'))
+INTERNED_LISTS = frozenset(('traits', 'biomes'))
+
+_WHITESPACE = " \t\n\r"
+# A decode error this close to the end of the buffer may just be a literal, number
+# or escape cut off by the chunk boundary ("-Infinit" is the longest).
+CUT_TOKEN_CHARS = 8
+
+
+def normalize_pairs(pairs, schema=SCHEMA_KEYS, intern=sys.intern):
+    """object_pairs_hook that canonicalizes schema keys as each object is decoded.
+
+    Runs once per object at every depth, lists included, so no second pass or copy
+    is needed. Schema keys are lowercased, repeated values interned and biome names
+    stripped of the stray trailing spaces some files have.
+    """
+    record = {}
+    for key, value in pairs:
+        canonical = schema.get(key)
+        if canonical is None:
+            canonical = schema.get(key.lower())
+            if canonical is None:
+                record[intern(key)] = value
+                continue
+        if canonical in INTERNED_VALUES:
+            if value.__class__ is str:
+                value = intern(value)
+        elif canonical in INTERNED_LISTS and value.__class__ is list:
+            if canonical == 'biomes':
+                value[:] = [intern(item.strip()) if item.__class__ is str else item for item in value]
+            else:
+                value[:] = [intern(item) if item.__class__ is str else item for item in value]
+        record[canonical] = value
+    return record
+
+
+_decoder = json.JSONDecoder(object_pairs_hook=normalize_pairs)
+
+
+class JsonStream:
+    """Pull-style reader over a JSON document that is read from disk in chunks.
+
+    Containers the caller walks with object_keys()/array_items() are never built;
+    any other value is decoded on its own with JSONDecoder.raw_decode, so only the
+    current value and one chunk are held in memory. The sha1 of every byte read is
+    kept in digest.
+    """
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.sha1 = hashlib.sha1()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    @property
+    def digest(self):
+        return self.sha1.digest()
+
+    def _fill(self):
+        """Read one more chunk, dropping the text already consumed. False at end of file."""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        self.sha1.update(chunk)
+        self.eof = not chunk
+        self.buf = self.buf[self.pos:] + self._text.decode(chunk, final=self.eof)
+        self.pos = 0
+        return not self.eof
+
+    def drain(self):
+        """Read (and hash) whatever is left of the file."""
+        while self._fill():
+            self.pos = len(self.buf)
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it, '' at the end."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.buf, self.pos)
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                # Only a value cut off by the end of the chunk is worth another read;
+                # anything else is malformed, and reading on would pull in the whole file
+                cut = e.msg.startswith("Unterminated string") or len(self.buf) - e.pos <= CUT_TOKEN_CHARS
+                if cut and self._fill():
+                    continue
+                raise
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def object_keys(self):
+        """Walk an object whose '{' was just consumed, yielding each key.
+
+        The caller must consume the key's value (value(), or walk it) before asking
+        for the next key.
+        """
+        first = True
+        while True:
+            char = self.peek()
+            if char == "}":
+                self.pos += 1
+                return
+            if not first:
+                self.expect(",")
+            first = False
+            key = self.value()
+            if not isinstance(key, str):
+                raise json.JSONDecodeError("Expecting property name", self.buf, self.pos)
+            self.expect(":")
+            yield key
+
+    def array_items(self):
+        """Walk an array whose '[' was just consumed, yielding once per item.
+
+        The caller must consume each item before asking for the next one.
+        """
+        first = True
+        while True:
+            if self.peek() == "]":
+                self.pos += 1
+                return
+            if not first:
+                self.expect(",")
+            first = False
+            yield
+
+
+def _iter_system(stream):
+    """Yield (system name, planet) pairs for the system object starting at the stream."""
+    stream.expect("{")
+    name = None
+    waiting = []  # planets listed before the system's name
+    for key in stream.object_keys():
+        key = key.lower()
+        if key == 'name':
+            name = stream.value()
+        elif key == 'planets' and stream.peek() == "[":
+            stream.expect("[")
+            for _ in stream.array_items():
+                planet = stream.value()
+                if name is None:
+                    waiting.append(planet)
+                else:
+                    yield name, planet
+        else:
+            stream.value()
+    for planet in waiting:
+        yield name or '', planet
+
+
+def iter_system_planets(stream):
+    """Yield (system name, planet) pairs from a system file, one planet at a time.
+
+    Only the planet being decoded is held in memory; its keys are normalized by
+    normalize_pairs while it is decoded, never in a second pass.
+    """
+    stream.expect("{")
+    found = False
+    for key in stream.object_keys():
+        if key.lower() in SYSTEMS_KEYS and stream.peek() == "[":
+            found = True
+            stream.expect("[")
+            for _ in stream.array_items():
+                yield from _iter_system(stream)
+        else:
+            stream.value()
+    if not found:
+        raise ValueError("No 'systems' list")
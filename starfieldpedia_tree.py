@@ -0,0 +1,356 @@
+import math
+from tkinter import ttk
+
+# Number of top-level rows above which the planet list is virtualized.
+VIRTUALIZE_ABOVE = 300
+# Rows kept materialized above and below the visible page while virtualized.
+OVERSCAN = 20
+# Treeview row height in pixels when the theme doesn't set one.
+ROW_HEIGHT = 20
+# Lines moved per mouse wheel notch.
+WHEEL_LINES = 3
+# Treeview operations sent to Tcl per call by TreeBatch.
+BATCH_CHUNK = 1000
+# Rows scrolled or filtered out of view that are kept detached for reuse.
+DETACHED_LIMIT = 2000
+
+# One Tcl proc applies a whole list of Treeview operations, so a batch costs one
+# Python->Tcl crossing per BATCH_CHUNK operations instead of one per item. Detached
+# rows lose their children so they come back collapsed.
+BATCH_PROC = "starfieldpedia_tree_batch"
+BATCH_SCRIPT = """
+proc %s {tree ops} {
+    foreach op $ops {
+        set args [lassign $op kind]
+        switch -- $kind {
+            insert {
+                lassign $args parent index iid values tags
+                if {$iid eq ""} {
+                    $tree insert $parent $index -values $values -tags $tags
+                } else {
+                    $tree insert $parent $index -id $iid -values $values -tags $tags
+                }
+            }
+            move {
+                $tree move {*}$args
+            }
+            delete {
+                $tree delete $args
+            }
+            detach {
+                foreach iid $args {
+                    set children [$tree children $iid]
+                    if {[llength $children]} {
+                        $tree delete $children
+                    }
+                }
+                $tree detach $args
+            }
+        }
+    }
+}
+""" % BATCH_PROC
+
+
+def sort_key(value):
+    """Sort numbers numerically and everything else as text, missing values last."""
+    if isinstance(value, (int, float)) and not (isinstance(value, float) and math.isnan(value)):
+        return (0, value, "")
+    return (1, 0, str(value).lower())
+
+
+class TreeBatch:
+    """Queue Treeview inserts, moves, deletes and detaches and apply them in a few Tcl calls.
+
+    Nothing reaches the tree until commit(), or the end of a with block, so Tk
+    never gets to redraw a half-applied change. Operations run in the order they
+    were queued.
+    """
+
+    def __init__(self, tree, chunk=BATCH_CHUNK):
+        self.tree = tree
+        self.chunk = chunk
+        self.ops = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.commit()
+
+    def insert(self, parent, index, iid="", values=(), tags=()):
+        # Stringified as Treeview.insert does, or Tcl would show True/False as 1/0
+        self.ops.append(("insert", parent, index, iid, tuple(map(str, values)), tuple(tags)))
+
+    def move(self, iid, parent, index):
+        self.ops.append(("move", iid, parent, index))
+
+    def delete(self, *iids):
+        if iids:
+            self.ops.append(("delete",) + tuple(iids))
+
+    def detach(self, *iids):
+        """Unlink items (dropping their children) so they can be moved back in later."""
+        if iids:
+            self.ops.append(("detach",) + tuple(iids))
+
+    def commit(self):
+        if not self.ops:
+            return
+        tk = self.tree.tk
+        if not tk.call("info", "commands", BATCH_PROC):
+            tk.eval(BATCH_SCRIPT)
+        for start in range(0, len(self.ops), self.chunk):
+            tk.call(BATCH_PROC, str(self.tree), tuple(self.ops[start:start + self.chunk]))
+        self.ops = []
+
+
+class VirtualTreeview:
+    """Keep only the visible slice of a long list of top-level rows in a ttk.Treeview.
+
+    Row ids are used as item ids. While virtualized the Treeview holds at most a
+    page of rows plus OVERSCAN on either side; the scrollbar is driven from the
+    full row list and rows are paged in and out as the user scrolls. Expanded rows
+    keep their children while they stay materialized. Lists of VIRTUALIZE_ABOVE
+    rows or fewer are inserted in full and scrolled natively.
+
+    Rows leaving the view are detached rather than deleted, and moved back in when
+    they are wanted again, so filtering, resetting and scrolling reuse items. All
+    tree changes go through TreeBatch.
+    """
+
+    def __init__(self, tree, scrollbar, row_values, column_values=None,
+                 overscan=OVERSCAN, virtualize_above=VIRTUALIZE_ABOVE):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.row_values = row_values  # row id -> tuple of column values
+        self.column_values = column_values  # column index -> {row id: value}, for sorting
+        self.overscan = overscan
+        self.virtualize_above = virtualize_above
+        self.rows = []
+        self.start = 0  # index in self.rows of the first visible row
+        self.line = 0   # lines of that row's expansion scrolled past
+        self.window = (0, 0)
+        self.virtual = False
+        self.sort_column = None
+        self.sort_reverse = False
+        self.detached = {}  # iid -> None, oldest first
+
+        scrollbar.configure(command=self.yview)
+        tree.configure(yscrollcommand=self._on_tree_scroll)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            tree.bind(sequence, self._on_wheel, add="+")
+        tree.bind("<Configure>", lambda event: self.render(), add="+")
+        for idx, column in enumerate(tree["columns"]):
+            tree.heading(column, command=lambda idx=idx: self.sort_by(idx))
+
+    def set_rows(self, rows):
+        """Show a new list of row ids, keeping the current sort order."""
+        self.rows = list(rows)
+        if self.sort_column is not None:
+            self._sort()
+        self._reset()
+
+    def extend_rows(self, rows):
+        """Append row ids, e.g. while planets are still loading, without jumping to the top."""
+        self.rows.extend(rows)
+        if self.sort_column is not None:
+            self._sort()
+            self._clear()
+        elif self.virtual != (len(self.rows) > self.virtualize_above):
+            self._clear()
+        self.virtual = len(self.rows) > self.virtualize_above
+        self.render()
+
+    def replace_rows(self, old_rows, new_rows):
+        """Swap rows in place, e.g. after a system file was reloaded, keeping the scroll position.
+
+        New rows take the place of the first old row still in the list, or go at the end.
+        """
+        old_ids = set(old_rows)
+        kept = [row for row in self.rows if row not in old_ids]
+        at = next((pos for pos, row in enumerate(self.rows) if row in old_ids), len(kept))
+        self.rows = kept[:at] + list(new_rows) + kept[at:]
+        if self.sort_column is not None:
+            self._sort()
+        # Replaced rows have new values, so their items are deleted rather than kept for reuse
+        attached = set(self.tree.get_children())
+        stale = []
+        for iid in map(str, old_ids):
+            if iid in self.detached:
+                del self.detached[iid]
+                stale.append(iid)
+            elif iid in attached:
+                stale.append(iid)
+        with TreeBatch(self.tree) as batch:
+            batch.delete(*stale)
+        self.virtual = len(self.rows) > self.virtualize_above
+        self.window = (0, 0)
+        self.render()
+
+    def sort_by(self, column):
+        """Sort by a column index; sorting by the same column again reverses the order."""
+        self.sort_reverse = not self.sort_reverse if column == self.sort_column else False
+        self.sort_column = column
+        self._sort()
+        self._reset()
+
+    def _sort(self):
+        if self.column_values is not None:
+            values = self.column_values(self.sort_column)
+            key = lambda row: sort_key(values[row])
+        else:
+            key = lambda row: sort_key(self.row_values(row)[self.sort_column])
+        self.rows.sort(key=key, reverse=self.sort_reverse)
+
+    def _clear(self):
+        """Detach every top-level item and force the next render to rebuild the window."""
+        with TreeBatch(self.tree) as batch:
+            self._detach(batch, self.tree.get_children())
+        self.window = (0, 0)
+
+    def _detach(self, batch, iids):
+        batch.detach(*iids)
+        self.detached.update(dict.fromkeys(iids))
+        overflow = len(self.detached) - DETACHED_LIMIT
+        if overflow > 0:
+            oldest = list(self.detached)[:overflow]
+            batch.delete(*oldest)
+            for iid in oldest:
+                del self.detached[iid]
+
+    def _reset(self):
+        self._clear()
+        self.virtual = len(self.rows) > self.virtualize_above
+        self.start = self.line = 0
+        self.window = (0, 0)
+        self.render()
+        if not self.virtual:
+            self.tree.yview_moveto(0)
+
+    def page_size(self):
+        """Number of rows that fit in the Treeview right now."""
+        try:
+            row_height = int(float(ttk.Style(self.tree).lookup("Treeview", "rowheight")))
+        except (TypeError, ValueError):
+            row_height = 0
+        row_height = row_height or ROW_HEIGHT
+        return max(int(self.tree.cget("height")), self.tree.winfo_height() // row_height - 1, 1)
+
+    def _block_lines(self, iid):
+        """Lines a materialized row occupies, counting its open descendants."""
+        lines = 1
+        if self.tree.exists(iid) and self.tree.item(iid, "open"):
+            for child in self.tree.get_children(iid):
+                lines += self._block_lines(child)
+        return lines
+
+    def render(self):
+        """Materialize the rows around the current position and scroll to it."""
+        total = len(self.rows)
+        if self.virtual:
+            page = self.page_size()
+            self.start = max(0, min(self.start, total - 1))
+            low = max(0, self.start - self.overscan)
+            high = min(total, self.start + page + self.overscan)
+        else:
+            low, high = 0, total
+
+        if (low, high) != self.window:
+            wanted = [str(row) for row in self.rows[low:high]]
+            wanted_ids = set(wanted)
+            attached = self.tree.get_children()
+            stale = [iid for iid in attached if iid not in wanted_ids]
+            kept = set(attached).difference(stale)
+            with TreeBatch(self.tree) as batch:
+                self._detach(batch, stale)
+                # The window only ever slides over a fixed order, so surviving items are already
+                # in place and the others can be moved back or inserted at their final index.
+                for pos, iid in enumerate(wanted):
+                    if iid in kept:
+                        continue
+                    if iid in self.detached:
+                        del self.detached[iid]
+                        batch.move(iid, "", pos)
+                    else:
+                        batch.insert("", pos, iid, self.row_values(self.rows[low + pos]))
+            self.window = (low, high)
+
+        if self.virtual:
+            self._place()
+
+    def _place(self):
+        """Scroll the Treeview so the current row and line are at the top."""
+        low, high = self.window
+        lines_before = sum(self._block_lines(str(row)) for row in self.rows[low:self.start]) + self.line
+        total_lines = lines_before - self.line + sum(self._block_lines(str(row)) for row in self.rows[self.start:high])
+        self.tree.yview_moveto(lines_before / max(total_lines, 1))
+        total = max(len(self.rows), 1)
+        first = self.start / total
+        self.scrollbar.set(first, min(1.0, first + self.page_size() / total))
+
+    def _remaining_lines(self, page):
+        """Lines from the current position down, counted only as far as one page."""
+        rows = self.rows[self.start:self.start + page + 1]
+        return sum(self._block_lines(str(row)) for row in rows) - self.line
+
+    def scroll_lines(self, count):
+        """Move the view by count lines, stepping through expanded rows line by line."""
+        # Rows outside the window are never expanded, so they count as one line each
+        # and the window only has to be re-materialized once at the end.
+        page = self.page_size()
+        while count > 0:
+            if self._remaining_lines(page) <= page:
+                break
+            if self.line + 1 < self._block_lines(str(self.rows[self.start])):
+                self.line += 1
+            else:
+                self.start += 1
+                self.line = 0
+            count -= 1
+        while count < 0:
+            if self.line > 0:
+                self.line -= 1
+            elif self.start > 0:
+                self.start -= 1
+                self.line = self._block_lines(str(self.rows[self.start])) - 1
+            else:
+                break
+            count += 1
+        self.render()
+
+    def yview(self, *args):
+        """Scrollbar command: page the virtual window instead of scrolling the Treeview."""
+        if not self.virtual:
+            return self.tree.yview(*args)
+        if args[0] == "moveto":
+            self.start = int(float(args[1]) * len(self.rows))
+            self.line = 0
+            self.start = max(0, min(self.start, len(self.rows) - self.page_size()))
+            self.render()
+        elif args[0] == "scroll":
+            count = int(args[1])
+            if args[2] == "pages":
+                count *= self.page_size()
+            self.scroll_lines(count)
+
+    def _on_tree_scroll(self, first, last):
+        # While virtualized the Treeview only knows about its window, so its own
+        # scroll fractions would be misleading.
+        if not self.virtual:
+            self.scrollbar.set(first, last)
+
+    def _on_wheel(self, event):
+        if not self.virtual:
+            return None
+        if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0:
+            self.scroll_lines(-WHEEL_LINES)
+        else:
+            self.scroll_lines(WHEEL_LINES)
+        return "break"
+
+    def refresh(self):
+        """Re-place the view after rows were expanded or collapsed."""
+        if self.virtual:
+            self._place()
@@ -0,0 +1,72 @@
+import os
+import time
+
+from starfieldpedia_catalog import SYSTEMS_DIRECTORY
+
+# The directory has to stay unchanged this long before its changes are reported, so a
+# save that is still being written, an editor's write-then-rename or a whole git pull
+# is picked up once.
+DEBOUNCE_SECONDS = 0.75
+
+
+def scan_directory(directory, suffix=".json"):
+    """Return {path: (mtime_ns, size)} for the files in a directory ending in suffix."""
+    stamps = {}
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return stamps
+    for entry in entries:
+        if entry.name.endswith(suffix) and entry.is_file():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue  # deleted between scandir and stat
+            stamps[os.path.join(directory, entry.name)] = (stat.st_mtime_ns, stat.st_size)
+    return stamps
+
+
+class DirectoryWatcher:
+    """Poll a directory for added, modified and deleted system files.
+
+    Polling one small directory with os.scandir costs next to nothing and needs no
+    platform-specific notification API. Changes are held back until no file has
+    changed for debounce seconds and are then all reported together by one poll(),
+    so a burst of changes gives one reload.
+    """
+
+    def __init__(self, directory=SYSTEMS_DIRECTORY, known=None, debounce=DEBOUNCE_SECONDS, clock=time.monotonic):
+        self.directory = directory
+        self.debounce = debounce
+        self.clock = clock
+        # Stamps the caller already has loaded; defaults to whatever is there now
+        self.known = dict(scan_directory(directory) if known is None else known)
+        self._pending = {}  # path -> (stamp or None, time it was last seen changing)
+
+    def poll(self):
+        """Return (added, modified, deleted) lists of paths whose changes have settled."""
+        now = self.clock()
+        current = scan_directory(self.directory)
+        for path in set(current) | set(self.known) | set(self._pending):
+            stamp = current.get(path)
+            pending = self._pending.get(path)
+            if pending is not None and pending[0] == stamp:
+                continue
+            if stamp == self.known.get(path):
+                self._pending.pop(path, None)  # changed back before it settled
+            else:
+                self._pending[path] = (stamp, now)
+
+        added, modified, deleted = [], [], []
+        # Any file still changing holds back the whole set
+        if not self._pending or now - max(seen for _, seen in self._pending.values()) < self.debounce:
+            return added, modified, deleted
+        for path, (stamp, seen) in self._pending.items():
+            if stamp is None:
+                deleted.append(path)
+                del self.known[path]
+            else:
+                (modified if path in self.known else added).append(path)
+                self.known[path] = stamp
+        self._pending = {}
+        return sorted(added), sorted(modified), sorted(deleted)